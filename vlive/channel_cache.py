@@ -0,0 +1,45 @@
+import time
+from typing import Any, Dict, Iterable, NamedTuple, Optional
+
+DEFAULT_TTL = 6 * 60 * 60  # 6 hours
+
+
+class ChannelInfo(NamedTuple):
+    name: str
+    fetched: float
+
+
+class ChannelCache:
+    """Display names of VLive channels, keyed by channel code.
+
+    Names are picked up from the posts the poller already fetches, so they
+    stay fresh without requests of their own.  Entries older than `ttl` are
+    treated as missing.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+
+        self._entries: Dict[str, ChannelInfo] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, channel_code: str, now: float = None) -> Optional[str]:
+        entry = self._entries.get(channel_code)
+        if entry is None or (time.time() if now is None else now) - entry.fetched >= self.ttl:
+            return None
+        return entry.name
+
+    def put(self, channel_code: str, name: str) -> None:
+        self._entries[channel_code] = ChannelInfo(name, time.time())
+
+    def update(self, channel_code: str, posts: Iterable[Dict[str, Any]]) -> None:
+        """Take the channel's name from the first of its posts that has one"""
+        for post in posts:
+            if name := post.get('channel', {}).get('channelName'):
+                self.put(channel_code, name)
+                return
+
+    def discard(self, channel_code: str) -> None:
+        self._entries.pop(channel_code, None)
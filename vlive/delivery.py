@@ -0,0 +1,28 @@
+from collections import deque
+from typing import Deque, Optional
+
+
+class DeliveryStats:
+    """Counts of sends to Discord, and how long after a video was posted each one went out."""
+
+    def __init__(self, history: int = 500):
+        self.sent = 0
+        self.failed = 0
+        self.latencies: Deque[float] = deque(maxlen=history)
+
+    def record(self, latency: float) -> None:
+        self.sent += 1
+        self.latencies.append(latency)
+
+    def percentile(self, pct: float) -> Optional[float]:
+        values = sorted(self.latencies)
+        if not values:
+            return None
+        return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+    def __str__(self):
+        text = f"{self.sent} sent, {self.failed} failed"
+        if self.latencies:
+            text += (f"\nPosted to sent: p50 {self.percentile(50):.1f}s, p95 {self.percentile(95):.1f}s,"
+                     f" max {max(self.latencies):.1f}s")
+        return text
@@ -0,0 +1,109 @@
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger('red.aradiacogs.vlive')
+
+
+class CycleReport:
+    def __init__(self):
+        self.started = time.time()
+        self.duration = 0.0
+        self.succeeded = 0
+        self.failed = 0
+        self.skipped = 0
+        self.slowest: Optional[Tuple[str, float]] = None
+
+    def record(self, channel: str, elapsed: float, ok: bool) -> None:
+        if ok:
+            self.succeeded += 1
+        else:
+            self.failed += 1
+        if self.slowest is None or elapsed > self.slowest[1]:
+            self.slowest = (channel, elapsed)
+
+    def __str__(self):
+        text = (f"Cycle took {self.duration:.2f}s: {self.succeeded} succeeded, {self.failed} failed,"
+                f" {self.skipped} backing off")
+        if self.slowest is not None:
+            text += f"\nSlowest channel: {self.slowest[0]} ({self.slowest[1]:.2f}s)"
+        return text
+
+
+class ChannelPoller:
+    """Poll many channels with a bounded number of requests in flight.
+
+    Each channel is fetched under a timeout and handled on its own, so one
+    slow or failing channel can't hold up or abort the rest of the cycle.
+    Channels whose fetch fails are skipped for an exponentially growing backoff
+    until they succeed again.
+    """
+
+    def __init__(self, concurrency: int = 5, timeout: float = 15, base_backoff: float = 60,
+                 max_backoff: float = 60 * 60):
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self.failures: Dict[str, int] = {}
+        self.retry_at: Dict[str, float] = {}
+        self.last_report: Optional[CycleReport] = None
+
+    def backing_off(self, channel: str, now: float = None) -> bool:
+        return self.retry_at.get(channel, 0) > (time.time() if now is None else now)
+
+    def succeeded(self, channel: str) -> None:
+        self.failures.pop(channel, None)
+        self.retry_at.pop(channel, None)
+
+    def failed(self, channel: str, now: float = None) -> float:
+        """Record a failure and return how long to wait before trying the channel again"""
+        self.failures[channel] = self.failures.get(channel, 0) + 1
+        backoff = min(self.base_backoff * 2 ** (self.failures[channel] - 1), self.max_backoff)
+        backoff *= random.uniform(0.8, 1.2)
+        self.retry_at[channel] = (time.time() if now is None else now) + backoff
+        return backoff
+
+    async def poll(self, channels: Iterable[str], fetch: Callable[[str], Awaitable[Any]],
+                   handle: Callable[[str, Any], Awaitable[None]]) -> CycleReport:
+        """Fetch every channel that isn't backing off and hand each result to `handle` as it arrives"""
+        report = CycleReport()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def poll_channel(channel):
+            async with semaphore:
+                start = time.perf_counter()
+                try:
+                    data = await asyncio.wait_for(fetch(channel), self.timeout)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    backoff = self.failed(channel)
+                    logger.warning("Error polling %s, retrying in %.0fs: %r", channel, backoff, e)
+                    report.record(channel, time.perf_counter() - start, False)
+                    return
+                self.succeeded(channel)
+                report.record(channel, time.perf_counter() - start, True)
+
+            # Failures here are on our end or Discord's, so they don't count against the channel
+            try:
+                await handle(channel, data)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error handling posts from %s", channel)
+
+        due = []
+        for channel in channels:
+            if self.backing_off(channel):
+                report.skipped += 1
+            else:
+                due.append(channel)
+        await asyncio.gather(*(poll_channel(channel) for channel in due))
+
+        report.duration = time.time() - report.started
+        self.last_report = report
+        return report
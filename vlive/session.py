@@ -0,0 +1,66 @@
+import asyncio
+from collections import Counter
+from typing import Dict, Optional
+
+import aiohttp
+
+
+class SessionManager:
+    """A single keep-alive aiohttp session shared by every VLive request.
+
+    Connections to the VLive API are pooled and reused across polls instead
+    of paying for a new TLS handshake per channel.  Trace hooks count how
+    many connections were opened versus reused.
+    """
+
+    def __init__(self, limit: int = 30, limit_per_host: int = 10, keepalive_timeout: float = 75,
+                 ttl_dns_cache: int = 300, timeout: float = 20):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.timeout = timeout
+
+        self.counts = Counter()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> aiohttp.ClientSession:
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                                 keepalive_timeout=self.keepalive_timeout,
+                                                 ttl_dns_cache=self.ttl_dns_cache)
+                self._session = aiohttp.ClientSession(connector=connector,
+                                                      timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                                      trace_configs=[self._trace_config()])
+            return self._session
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        def counter(name):
+            async def count(session, context, params):
+                self.counts[name] += 1
+
+            return count
+
+        trace_config.on_request_start.append(counter('requests'))
+        trace_config.on_request_exception.append(counter('errors'))
+        trace_config.on_connection_create_end.append(counter('opened'))
+        trace_config.on_connection_reuseconn.append(counter('reused'))
+        return trace_config
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._session is not None:
+                await self._session.close()
+            self._session = None
+
+    def stats(self) -> Dict[str, int]:
+        return {key: self.counts[key] for key in ('requests', 'errors', 'opened', 'reused')}
+
+    def __str__(self):
+        stats = self.stats()
+        return (f"{stats['requests']} requests ({stats['errors']} errors),"
+                f" {stats['opened']} connections opened, {stats['reused']} reused")
@@ -5,21 +5,26 @@ import time
 from contextlib import suppress
 from datetime import datetime
 from io import BytesIO
-from typing import NoReturn
+from typing import Dict, NoReturn, Optional
 
-import aiohttp
 import discord
 from discordmenu.embed.components import EmbedBodyImage, EmbedField, EmbedFooter, EmbedMain, EmbedThumbnail
 from discordmenu.embed.text import Text
 from discordmenu.embed.view import EmbedView
-from redbot.core import Config, commands
+from redbot.core import Config, checks, commands
 from redbot.core.bot import Red
 from redbot.core.utils.chat_formatting import box
 from tsutils.helper_functions import repeating_timer
 
+from vlive.channel_cache import ChannelCache
+from vlive.delivery import DeliveryStats
+from vlive.poller import ChannelPoller
+from vlive.session import SessionManager
+
 logger = logging.getLogger('red.aradiacogs.vlive')
 fields = "author,channel{channelName,channelCode},createdAt," \
          "officialVideo,thumbnail,title,url"
+SEND_CONCURRENCY = 10
 
 
 class VLive(commands.Cog):
@@ -28,9 +33,16 @@ class VLive(commands.Cog):
         self.bot = bot
 
         self.config = Config.get_conf(self, identifier=77173)
-        self.config.register_global(channels={}, last_check=time.time())
+        self.config.register_global(channels={}, last_check=time.time(), concurrency=5, watermarks={})
 
-        self.session = aiohttp.ClientSession()
+        self.sessions = SessionManager()
+        self.poller = ChannelPoller()
+        self.channel_cache = ChannelCache()
+        self.send_semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+        self.delivery_stats = DeliveryStats()
+        # The createdAt of the newest video sent from each channel, in milliseconds
+        self.watermarks: Optional[Dict[str, int]] = None
+        self.watermarks_dirty = False
 
         self._loop = bot.loop.create_task(self.do_loop())
 
@@ -48,7 +60,7 @@ class VLive(commands.Cog):
 
     def cog_unload(self):
         self._loop.cancel()
-        self.bot.loop.create_task(self.session.close())
+        self.bot.loop.create_task(self.sessions.close())
 
     async def do_loop(self) -> NoReturn:
         await self.bot.wait_until_ready()
@@ -61,40 +73,119 @@ class VLive(commands.Cog):
                 except Exception:
                     logger.exception("Error in loop:")
 
+    async def load_watermarks(self):
+        if self.watermarks is not None:
+            return
+        watermarks = await self.config.watermarks()
+        last_check = await self.config.last_check()
+        if last_check < 10 ** 12:
+            # last_check used to start out in seconds rather than milliseconds
+            last_check *= 1000
+        for vc in await self.config.channels():
+            watermarks.setdefault(vc, int(last_check))
+        self.watermarks = watermarks
+
+    async def flush_watermarks(self):
+        if self.watermarks_dirty:
+            self.watermarks_dirty = False
+            await self.config.watermarks.set(self.watermarks)
+
     async def do_check(self):
-        async def get_both_data(vc, vd):
-            return await self.get_data(vc), vd
+        await self.load_watermarks()
+        channels = await self.config.channels()
+        self.poller.concurrency = await self.config.concurrency()
 
-        last_check = await self.config.last_check()
-        aws = [get_both_data(vc, vd) for vc, vd in (await self.config.channels()).items()]
-        for aw in asyncio.as_completed(aws):
-            data, vdata = await aw
-            if not data:
-                continue
-            await self.send_channel_data(data['data'], vdata, last_check)
-
-    async def send_channel_data(self, data, vdata, last_check):
-        for video in data:
-            if 'officialVideo' not in video:
-                continue
-            if video['createdAt'] <= last_check:
-                continue
-            with suppress(discord.Forbidden):
+        async def handle(vc, data):
+            if data:
+                self.channel_cache.update(vc, data['data'])
+                await self.send_channel_data(vc, data['data'], channels[vc])
+
+        try:
+            report = await self.poller.poll(channels, self.get_data, handle)
+            logger.debug(str(report))
+        finally:
+            await self.flush_watermarks()
+
+    async def send_channel_data(self, vc, data, vdata):
+        if (watermark := self.watermarks.get(vc)) is None:
+            # The last subscriber was removed since this cycle started
+            return
+        videos = sorted((video for video in data
+                         if 'officialVideo' in video and video['createdAt'] > watermark),
+                        key=lambda video: video['createdAt'])
+        for video in videos:
+            if vc not in self.watermarks:
+                return
+            try:
                 embed = await self.send_video(video)
-            for conf in vdata:
-                if (channel := self.bot.get_channel(conf['channel'])) is None:
-                    continue
-                text = ""
-                if conf.get('role'):
-                    text = f"<@&{conf['role']}>"
-                await channel.send(text, embed=embed)
-            if video['createdAt'] > await self.config.last_check():
-                await self.config.last_check.set(video['createdAt'])
+            except Exception:
+                logger.exception("Unable to render %s.", video.get('url'))
+            else:
+                # Videos go out one at a time so channels get them in order
+                await self.deliver(video, embed, vdata)
+            # Saved once at the end of the cycle
+            if vc in self.watermarks:
+                self.watermarks[vc] = max(self.watermarks[vc], video['createdAt'])
+                self.watermarks_dirty = True
+
+    async def deliver(self, video, embed, vdata):
+        """Send a rendered video to every subscribed channel at once, up to SEND_CONCURRENCY at a time"""
+        async def send(conf):
+            if (channel := self.bot.get_channel(conf['channel'])) is None:
+                return
+            text = ""
+            if conf.get('role'):
+                text = f"<@&{conf['role']}>"
+            async with self.send_semaphore:
+                try:
+                    await channel.send(text, embed=embed)
+                except (discord.Forbidden, discord.NotFound):
+                    self.delivery_stats.failed += 1
+                    return
+                except Exception:
+                    # Includes connection errors, which discord.py doesn't wrap
+                    self.delivery_stats.failed += 1
+                    logger.exception("Unable to send %s to %s.", video.get('url'), conf['channel'])
+                    return
+            self.delivery_stats.record(time.time() - video['createdAt'] / 1000)
+
+        await asyncio.gather(*(send(conf) for conf in vdata))
 
     @commands.group()
     async def vlive(self, ctx):
         """The base command for VLive related subcommands"""
 
+    @vlive.command(name="stats")
+    @checks.is_owner()
+    async def v_stats(self, ctx):
+        """Show how the shared HTTP session is being used"""
+        await ctx.send(box(f"HTTP session: {self.sessions}\n"
+                           f"Cached channel names: {len(self.channel_cache)}\n"
+                           f"Deliveries: {self.delivery_stats}"))
+
+    @vlive.command(name="report")
+    @checks.is_owner()
+    async def v_report(self, ctx):
+        """Show how the last poll of every channel went"""
+        if self.poller.last_report is None:
+            return await ctx.send("No channels have been polled yet.")
+        text = str(self.poller.last_report)
+        now = time.time()
+        backing_off = [f"{vc}: {failures} failures, retrying in {self.poller.retry_at[vc] - now:.0f}s"
+                       for vc, failures in self.poller.failures.items() if self.poller.backing_off(vc, now)]
+        if backing_off:
+            text += "\nBacking off:\n" + "\n".join(backing_off)
+        await ctx.send(box(text))
+
+    @vlive.command(name="setconcurrency")
+    @checks.is_owner()
+    async def v_setconcurrency(self, ctx, concurrency: int):
+        """Sets how many VLive channels are checked at the same time"""
+        if concurrency < 1:
+            return await ctx.send("concurrency must be at least 1.")
+        await self.config.concurrency.set(concurrency)
+        await ctx.tick()
+
     @vlive.command(name="add")
     async def v_add(self, ctx, channel_name, role: discord.Role = None):
         """Subscribe to a VLive channel in this Discord channel"""
@@ -102,14 +193,19 @@ class VLive(commands.Cog):
             return await ctx.send(f"You need to set up your app ID with"
                                   f" `{ctx.prefix}set api vlive appID <APP ID>`")
 
+        await self.load_watermarks()
         async with self.config.channels() as channels:
             if channel_name not in channels:
                 channels[channel_name] = []
+                # Only send videos posted from now on
+                self.watermarks.setdefault(channel_name, int(time.time() * 1000))
+                self.watermarks_dirty = True
             role_id = role.id if role else None
             for conf in channels[channel_name][:]:
                 if conf['channel'] == ctx.channel.id:
                     channels[channel_name].remove(conf)
             channels[channel_name].append({'channel': ctx.channel.id, 'role': role_id})
+        await self.flush_watermarks()
         await ctx.tick()
 
     @vlive.command(name="remove")
@@ -122,16 +218,24 @@ class VLive(commands.Cog):
                         channels[channel_name].remove(conf)
             if not channels[channel_name]:
                 del channels[channel_name]
+                self.channel_cache.discard(channel_name)
+                if self.watermarks is not None and self.watermarks.pop(channel_name, None) is not None:
+                    self.watermarks_dirty = True
+        await self.flush_watermarks()
         await ctx.tick()
 
     @vlive.command(name="list")
     async def v_list(self, ctx):
         """List all subscribed VLive channels"""
         channels = await self.config.channels()
-        valid_channels = []
-        for vc, data in channels.items():
-            if any(ctx.channel.id == conf['channel'] for conf in data):
-                valid_channels.append(f"{(await self.get_data(vc))['data'][0]['channel']['channelName']} ({vc})")
+        subscribed = [vc for vc, data in channels.items() if any(ctx.channel.id == conf['channel'] for conf in data)]
+        # Channels the poller hasn't seen lately are looked up all at once
+        missing = [vc for vc in subscribed if self.channel_cache.get(vc) is None]
+        for vc, data in zip(missing, await asyncio.gather(*(self.get_data(vc) for vc in missing),
+                                                           return_exceptions=True)):
+            if isinstance(data, dict):
+                self.channel_cache.update(vc, data['data'])
+        valid_channels = [f"{self.channel_cache.get(vc) or 'Unknown'} ({vc})" for vc in subscribed]
         await ctx.send(box('\n'.join(valid_channels)))
 
     async def get_data(self, channel):
@@ -141,10 +245,10 @@ class VLive(commands.Cog):
         params = {'appId': app_id, 'fields': fields, 'gcc': 'HU', 'locale': 'en_US'}
         headers = {'Referer': 'https://www.vlive.tv/'}
 
-        async with aiohttp.ClientSession() as session:
-            async with session.get(endpoint.format(channel), params=params, headers=headers) as resp:
-                resp.raise_for_status()
-                return await resp.json()
+        session = await self.sessions.get()
+        async with session.get(endpoint.format(channel), params=params, headers=headers) as resp:
+            resp.raise_for_status()
+            return await resp.json()
 
     async def send_video(self, video):
         return EmbedView(
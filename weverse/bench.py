@@ -0,0 +1,342 @@
+"""Offline benchmarks for the Weverse cog.
+
+Run with `python -m weverse.bench [seen|render|replay]` from the repository
+root.  `replay` feeds a recorded fixture through the cog's notification
+pipeline with a stub Weverse client and fake Discord channels.
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timezone
+from functools import wraps
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Tuple
+
+from weverse.delivery_queue import DeliveryQueue
+from weverse.dispatcher import DeliveryDispatcher
+from weverse.render_cache import RenderCache
+from weverse.scheduler import AdaptiveScheduler
+from weverse.seen_store import SeenStore
+from weverse.subscriptions import SubscriptionIndex
+from weverse.translation_cache import TranslationCache
+from weverse.weverse import Weverse
+
+FIXTURE_PATH = Path(__file__).parent / 'fixtures' / 'replay.json'
+
+HISTORY_SIZES = (1000, 10000, 50000)
+NOTIFS_PER_POLL = 20
+POLLS = 20
+RENDERS = 50
+
+
+def bench_legacy_seen(history: int) -> float:
+    """Cost per poll of the old flat list, re-read and re-serialized per notification."""
+    seen = list(range(history))
+    next_id = history
+    start = time.perf_counter()
+    for _ in range(POLLS):
+        for _ in range(NOTIFS_PER_POLL):
+            if next_id in seen:
+                continue
+            seen.append(next_id)
+            json.dumps(seen)
+            next_id += 1
+    return (time.perf_counter() - start) / POLLS
+
+
+def bench_seen_store(history: int) -> Tuple[float, float]:
+    """Cost per poll of the bounded window, for polls that find new IDs and polls that don't.
+
+    Flushes the same way `Weverse.flush_seen` does.
+    """
+    store = SeenStore()
+    now = time.time()
+    # Spread the history over twice `max_age` so old entries keep expiring during the run
+    step = 2 * store.max_age / history
+    store.load([[notif_id, now - store.max_age * 2 + notif_id * step] for notif_id in range(history)])
+    json.dumps(store.dump())
+
+    def flush():
+        if store.dirty:
+            store.evict()
+            json.dumps(store.dump())
+
+    next_id = history
+    start = time.perf_counter()
+    for _ in range(POLLS):
+        for _ in range(NOTIFS_PER_POLL):
+            if next_id in store:
+                continue
+            store.add(next_id)
+            next_id += 1
+        flush()
+    busy = (time.perf_counter() - start) / POLLS
+
+    start = time.perf_counter()
+    for _ in range(POLLS):
+        flush()
+    idle = (time.perf_counter() - start) / POLLS
+    return busy, idle
+
+
+def to_namespace(data):
+    if isinstance(data, dict):
+        return SimpleNamespace(**{key: to_namespace(value) for key, value in data.items()})
+    if isinstance(data, list):
+        return [to_namespace(value) for value in data]
+    return data
+
+
+class StubWeverseClient:
+    """Serves a recorded fixture in place of WeverseClientAsync."""
+    cache_loaded = True
+
+    def __init__(self, fixture, repeat: int = 1, fetch_latency: float = 0):
+        self.fetch_latency = fetch_latency
+
+        self.posts = {int(k): to_namespace(v) for k, v in fixture['posts'].items()}
+        self.media = {int(k): to_namespace(v) for k, v in fixture['media'].items()}
+        self.announcements = {int(k): to_namespace(v) for k, v in fixture['announcements'].items()}
+        self.comments = {int(k): v for k, v in fixture['comments'].items()}
+        self.types = {notif['message']: notif['type'] for notif in fixture['notifications']}
+
+        # Repeat the recording with fresh IDs to get a longer replay
+        self.notifications = []
+        for n in range(repeat):
+            for notif in fixture['notifications']:
+                notif = dict(notif, id=notif['id'] + n * 1000000)
+                self.notifications.append(to_namespace(notif))
+        self.new_notifications = []
+
+    async def check_new_user_notifications(self):
+        await asyncio.sleep(self.fetch_latency)
+        now = datetime.now(timezone.utc).isoformat()
+        for notif in self.notifications:
+            notif.notified_at = now
+        self.new_notifications = self.notifications
+
+    def get_new_notifications(self):
+        return self.new_notifications
+
+    def determine_notification_type(self, message):
+        return self.types[message]
+
+    async def fetch_comment_body(self, community_id, contents_id):
+        await asyncio.sleep(self.fetch_latency)
+        return self.comments.get(contents_id)
+
+    async def fetch_artist_comments(self, community_id, contents_id):
+        return []
+
+    def get_post_by_id(self, contents_id):
+        return self.posts.get(contents_id)
+
+    def get_media_by_id(self, contents_id):
+        return self.media.get(contents_id)
+
+    def get_announcement_by_id(self, contents_id):
+        return self.announcements.get(contents_id)
+
+
+class FakePapago:
+    def __init__(self, latency: float = 0):
+        self.latency = latency
+        self.requests = 0
+
+    async def translate(self, source, target, text):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return f"[{target}] {text}"
+
+
+class FakeChannel:
+    """A text channel that records every message sent to it."""
+
+    def __init__(self, channel_id: int, guild_id: int, sink, latency: float = 0):
+        self.id = channel_id
+        self.guild = SimpleNamespace(id=guild_id)
+        self.sink = sink
+        self.latency = latency
+
+    async def send(self, content=None, *, embed=None, allowed_mentions=None):
+        await asyncio.sleep(self.latency)
+        self.sink.append((time.perf_counter(), self.id, content, embed))
+
+
+class FakeBot:
+    def __init__(self, channels, papago):
+        self.channels = {channel.id: channel for channel in channels}
+        self.papago = papago
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    def get_cog(self, name):
+        return self.papago if name == "Papago" else None
+
+
+class StageTimer:
+    """Wrap coroutine functions and add up how long each stage spends in them."""
+
+    def __init__(self):
+        self.totals = defaultdict(float)
+        self.calls = defaultdict(int)
+
+    def wrap(self, stage, func):
+        @wraps(func)
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self.totals[stage] += time.perf_counter() - start
+                self.calls[stage] += 1
+
+        return timed
+
+
+def load_fixture(path: Path = FIXTURE_PATH):
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def make_stub_cog(fixture=None, *, channels: int = 0, repeat: int = 1, fetch_latency: float = 0,
+                  translate_latency: float = 0, send_latency: float = 0, pace: bool = False):
+    """Make a Weverse cog that doesn't need a bot, Config or network access.
+
+    Returns the cog and the list that every fake channel appends its sends to.
+    Each community in the fixture gets `channels` subscribed channels spread
+    over a handful of guilds.
+    """
+    if fixture is None:
+        fixture = load_fixture()
+    sink = []
+    communities = sorted({notif['community_name'] for notif in fixture['notifications']})
+    fake_channels = [FakeChannel(n, n % 5, sink, send_latency) for n in range(channels * len(communities))]
+
+    cog = Weverse.__new__(Weverse)
+    cog.bot = FakeBot(fake_channels, FakePapago(translate_latency))
+    cog.weverse_client = StubWeverseClient(fixture, repeat, fetch_latency)
+    cog.seen = SeenStore()
+    cog.seen.load([])
+    cog.subscriptions = SubscriptionIndex()
+    cog.subscriptions.build({
+        channel.id: {'channels': {communities[channel.id % len(communities)].lower(): {
+            'role_id': 0, 'show_comments': True}}}
+        for channel in fake_channels
+    })
+    if pace:
+        cog.dispatcher = DeliveryDispatcher()
+    else:
+        cog.dispatcher = DeliveryDispatcher(channel_rate=(10 ** 9, 1), global_rate=(10 ** 9, 1))
+    cog.queue = DeliveryQueue()
+    cog.scheduler = AdaptiveScheduler()
+    cog.renders = RenderCache()
+    cog.translations = TranslationCache(Path(tempfile.gettempdir()) / 'weverse_bench_translations.json')
+    return cog, sink
+
+
+async def bench_render(noti_type: str):
+    """Return (cold, cached) seconds per render of one notification type.
+
+    The notifications all point at the same content, like duplicate
+    notifications do.  Cold renders start from an empty render cache.
+    """
+    fixture = load_fixture()
+    fixture['notifications'] = [notif for notif in fixture['notifications'] if notif['type'] == noti_type][:1]
+    cog, _ = make_stub_cog(fixture, repeat=RENDERS)
+    notifs = cog.weverse_client.notifications
+
+    start = time.perf_counter()
+    for notif in notifs:
+        cog.renders = RenderCache()
+        await cog.render_notification(notif, notif.community_name)
+    cold = (time.perf_counter() - start) / RENDERS
+
+    start = time.perf_counter()
+    for notif in notifs:
+        await cog.render_notification(notif, notif.community_name)
+    cached = (time.perf_counter() - start) / RENDERS
+    return cold, cached
+
+
+async def replay(args):
+    """Replay the fixture through one poll cycle and report throughput, stage latency and memory."""
+    cog, sink = make_stub_cog(load_fixture(args.fixture), channels=args.channels, repeat=args.repeat,
+                              fetch_latency=args.fetch_latency, translate_latency=args.translate_latency,
+                              send_latency=args.send_latency, pace=args.pace)
+    timer = StageTimer()
+    client = cog.weverse_client
+    client.check_new_user_notifications = timer.wrap('fetch', client.check_new_user_notifications)
+    client.fetch_comment_body = timer.wrap('fetch', client.fetch_comment_body)
+    cog.papago_translate = timer.wrap('translate', cog.papago_translate)
+    cog.render_notification = timer.wrap('render', cog.render_notification)
+    cog.send_weverse_to_channel = timer.wrap('send', cog.send_weverse_to_channel)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    found = await cog.process_notifications()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"Replayed {found} notifications to {len(cog.bot.channels)} channels in {elapsed:.3f}s")
+    print(f"Throughput: {found / elapsed:.1f} notifications/s, {len(sink)} Discord sends")
+    print(f"Papago requests: {cog.bot.papago.requests}, render cache: {cog.renders.hits} hits"
+          f" / {cog.renders.misses} misses")
+    print(f"Failed deliveries: {sum(report.failed for report in cog.dispatcher.reports)},"
+          f" queued for retry: {len(cog.queue.pending)}")
+    if (lag := cog.scheduler.average_lag()) is not None:
+        print(f"End-to-end lag: {lag:.3f}s average, {max(cog.scheduler.lags):.3f}s max")
+    print(f"Peak traced memory: {peak / 1024:.1f} KiB")
+    print()
+    print(f"{'stage':>10} {'calls':>7} {'total ms':>10} {'avg ms':>9}")
+    for stage in ('fetch', 'translate', 'render', 'send'):
+        calls = timer.calls[stage]
+        total = timer.totals[stage] * 1000
+        print(f"{stage:>10} {calls:>7} {total:>10.2f} {total / calls if calls else 0:>9.3f}")
+    print("(render includes comment fetches and translation; send includes pacing)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('benchmark', nargs='?', choices=('seen', 'render', 'replay', 'all'), default='all')
+    parser.add_argument('--fixture', type=Path, default=FIXTURE_PATH)
+    parser.add_argument('--channels', type=int, default=10, help="Subscribed channels per community")
+    parser.add_argument('--repeat', type=int, default=5, help="How many times to repeat the recorded fixture")
+    parser.add_argument('--fetch-latency', type=float, default=0)
+    parser.add_argument('--translate-latency', type=float, default=0)
+    parser.add_argument('--send-latency', type=float, default=0)
+    parser.add_argument('--pace', action='store_true', help="Pace sends to Discord's rate limits")
+    args = parser.parse_args()
+
+    if args.benchmark in ('seen', 'all'):
+        print(f"Seen index, {NOTIFS_PER_POLL} new notifications per poll")
+        print(f"{'history':>10} {'legacy ms/poll':>16} {'store ms/poll':>15} {'idle ms/poll':>14}")
+        for history in HISTORY_SIZES:
+            legacy = bench_legacy_seen(history) * 1000
+            busy, idle = bench_seen_store(history)
+            print(f"{history:>10} {legacy:>16.3f} {busy * 1000:>15.3f} {idle * 1000:>14.3f}")
+        print(f"(the store's cost grows with its window, which is capped at {SeenStore().max_size} IDs,"
+              f" not with history)")
+        print()
+
+    if args.benchmark in ('render', 'all'):
+        print(f"Render time per notification ({RENDERS} renders, cache size {RenderCache().max_size})")
+        print(f"{'type':>14} {'cold ms':>10} {'cached ms':>10}")
+        for noti_type in ('comment', 'post', 'media', 'announcement'):
+            cold, cached = asyncio.run(bench_render(noti_type))
+            print(f"{noti_type:>14} {cold * 1000:>10.3f} {cached * 1000:>10.3f}")
+        print()
+
+    if args.benchmark in ('replay', 'all'):
+        asyncio.run(replay(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+import re
+from bisect import bisect_left
+from difflib import get_close_matches
+from typing import Dict, Iterable, List
+
+NON_ALNUM = re.compile(r'[\W_]+')
+
+
+def normalize(name: str) -> str:
+    """Casefold a community name and strip spaces and punctuation."""
+    return NON_ALNUM.sub('', name.casefold())
+
+
+class CommunityIndex:
+    """A lookup table of Weverse communities by normalized name.
+
+    It's rebuilt whenever the client reloads its communities, so `weverse add`
+    doesn't have to scan every community and can suggest close matches
+    instead of listing all of them.
+    """
+
+    def __init__(self):
+        self._communities: Dict[str, object] = {}
+        self._names: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._communities)
+
+    def build(self, communities: Iterable) -> None:
+        self._communities = {normalize(community.name): community for community in communities}
+        self._names = sorted(self._communities)
+
+    def get(self, name: str):
+        return self._communities.get(normalize(name))
+
+    def search(self, name: str, limit: int = 5) -> List[str]:
+        """Return the display names of communities starting with or resembling `name`."""
+        key = normalize(name)
+        matches = []
+        if key:
+            start = bisect_left(self._names, key)
+            for norm in self._names[start:]:
+                if not norm.startswith(key) or len(matches) >= limit:
+                    break
+                matches.append(norm)
+        for norm in get_close_matches(key, self._names, n=limit, cutoff=.6):
+            if norm not in matches and len(matches) < limit:
+                matches.append(norm)
+        return [self._communities[norm].name for norm in matches]
@@ -0,0 +1,138 @@
+import time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import discord
+
+BASE_BACKOFF = 30
+MAX_BACKOFF = 60 * 60
+MAX_ATTEMPTS = 8
+MAX_DEAD_LETTERS = 100
+
+
+class Delivery:
+    """The messages for one notification going to one channel.
+
+    `sent` counts how many of the messages have gone out, so a retry picks up
+    where the last attempt failed instead of re-sending the whole notification.
+    """
+
+    def __init__(self, notif_id, channel_id: int, messages: List[Tuple[Optional[str], Optional[discord.Embed]]],
+                 sent: int = 0, attempts: int = 0, created: float = None, next_try: float = 0,
+                 error: Optional[str] = None):
+        self.notif_id = notif_id
+        self.channel_id = channel_id
+        self.messages = messages
+        self.sent = sent
+        self.attempts = attempts
+        self.created = time.time() if created is None else created
+        self.next_try = next_try
+        self.error = error
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'notif_id': self.notif_id,
+            'channel_id': self.channel_id,
+            'messages': [[content, embed and embed.to_dict()] for content, embed in self.messages],
+            'sent': self.sent,
+            'attempts': self.attempts,
+            'created': self.created,
+            'next_try': self.next_try,
+            'error': self.error,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Delivery':
+        data = dict(data)
+        data['messages'] = [(content, embed and discord.Embed.from_dict(embed))
+                            for content, embed in data['messages']]
+        return cls(**data)
+
+
+class DeadLetter(NamedTuple):
+    """What's kept of a delivery that failed for good.  The messages themselves are dropped."""
+    notif_id: Any
+    channel_id: int
+    error: str
+    created: float
+
+    def to_dict(self) -> Dict[str, Any]:
+        return self._asdict()
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DeadLetter':
+        return cls(data['notif_id'], data['channel_id'], data['error'], data['created'])
+
+
+class DeliveryQueue:
+    """Deliveries waiting to be retried, plus the ones that failed for good.
+
+    Transient failures are retried with exponential backoff.  Permanent
+    failures, and deliveries that run out of attempts, go to a bounded
+    dead-letter list so they can be inspected.
+    """
+
+    def __init__(self, base_backoff: float = BASE_BACKOFF, max_backoff: float = MAX_BACKOFF,
+                 max_attempts: int = MAX_ATTEMPTS, max_dead_letters: int = MAX_DEAD_LETTERS):
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.max_dead_letters = max_dead_letters
+
+        self.loaded = False
+        self.pending_dirty = False
+        self.dead_letters_dirty = False
+        self.pending: List[Delivery] = []
+        self.dead_letters: List[DeadLetter] = []
+
+    def load(self, pending: List[Dict[str, Any]], dead_letters: List[Dict[str, Any]]) -> None:
+        self.pending = [Delivery.from_dict(data) for data in pending]
+        self.dead_letters = [DeadLetter.from_dict(data) for data in dead_letters]
+        # Older dead letters kept their messages, so rewrite them without
+        self.dead_letters_dirty = any('messages' in data for data in dead_letters)
+        self.loaded = True
+
+    def dump_pending(self) -> List[Dict[str, Any]]:
+        self.pending_dirty = False
+        return [delivery.to_dict() for delivery in self.pending]
+
+    def dump_dead_letters(self) -> List[Dict[str, Any]]:
+        self.dead_letters_dirty = False
+        return [dead_letter.to_dict() for dead_letter in self.dead_letters]
+
+    def retry(self, delivery: Delivery, error) -> None:
+        """Schedule a delivery to be tried again, or dead-letter it if it's out of attempts."""
+        delivery.attempts += 1
+        delivery.error = str(error)
+        if delivery.attempts >= self.max_attempts:
+            self.dead_letter(delivery, error)
+            return
+        delivery.next_try = time.time() + min(self.base_backoff * 2 ** (delivery.attempts - 1), self.max_backoff)
+        if delivery not in self.pending:
+            self.pending.append(delivery)
+        self.pending_dirty = True
+
+    def dead_letter(self, delivery: Delivery, error) -> None:
+        self.complete(delivery)
+        self.dead_letters.append(DeadLetter(delivery.notif_id, delivery.channel_id, str(error), delivery.created))
+        del self.dead_letters[:-self.max_dead_letters]
+        self.dead_letters_dirty = True
+
+    def complete(self, delivery: Delivery) -> None:
+        if delivery in self.pending:
+            self.pending.remove(delivery)
+            self.pending_dirty = True
+
+    def drop_channel(self, channel_id: int) -> None:
+        """Forget pending deliveries to a channel that no longer exists."""
+        pending = [delivery for delivery in self.pending if delivery.channel_id != channel_id]
+        if len(pending) != len(self.pending):
+            self.pending = pending
+            self.pending_dirty = True
+
+    def due(self, now: float = None) -> List[Delivery]:
+        if now is None:
+            now = time.time()
+        return [delivery for delivery in self.pending if delivery.next_try <= now]
+
+    def oldest(self) -> Optional[Delivery]:
+        return min(self.pending, key=lambda delivery: delivery.created, default=None)
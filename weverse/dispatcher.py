@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Tuple
+
+import discord
+
+logger = logging.getLogger('red.aradiacogs.weverse.dispatcher')
+
+# Discord allows 5 messages per 5 seconds in a single channel
+CHANNEL_RATE = (5, 5)
+# Discord's global limit is 50 requests per second per bot.  Other cogs share it,
+# and discord.py handles any 429s that still get through.
+GLOBAL_RATE = (50, 1)
+
+
+class RateBucket:
+    """A token bucket that waits until a request fits within `rate` requests per `per` seconds."""
+
+    def __init__(self, rate: int, per: float):
+        self.rate = rate
+        self.per = per
+
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) * self.per / self.rate)
+
+
+class DeliveryReport:
+    def __init__(self, key, total: int):
+        self.key = key
+        self.total = total
+        self.delivered = 0
+        self.failed = 0
+        self.started = time.monotonic()
+        self.latencies: List[float] = []
+
+    @property
+    def first(self) -> Optional[float]:
+        return min(self.latencies, default=None)
+
+    @property
+    def last(self) -> Optional[float]:
+        return max(self.latencies, default=None)
+
+    def __str__(self):
+        if not self.latencies:
+            return f"{self.key}: 0/{self.total} delivered"
+        return (f"{self.key}: {self.delivered}/{self.total} delivered,"
+                f" first {self.first:.2f}s, last {self.last:.2f}s")
+
+
+class DeliveryDispatcher:
+    """Send to many channels at once while pacing each channel and the bot as a whole.
+
+    Every message goes through `send`, which first waits on the global and
+    channel rate buckets and only then takes one of `concurrency` send
+    slots, so a throttled channel doesn't hold a slot other channels could
+    use.
+    """
+
+    def __init__(self, concurrency: int = 10, channel_rate: Tuple[int, float] = CHANNEL_RATE,
+                 global_rate: Tuple[int, float] = GLOBAL_RATE, history: int = 100):
+        self.concurrency = concurrency
+        self.channel_rate = channel_rate
+
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.global_bucket = RateBucket(*global_rate)
+        self.channel_buckets: Dict[int, RateBucket] = {}
+        self.reports: Deque[DeliveryReport] = deque(maxlen=history)
+
+    async def pace(self, channel: discord.abc.Messageable) -> None:
+        """Wait until a message can be sent to `channel` without hitting a rate limit."""
+        if channel.id not in self.channel_buckets:
+            self.channel_buckets[channel.id] = RateBucket(*self.channel_rate)
+        await self.channel_buckets[channel.id].acquire()
+        await self.global_bucket.acquire()
+
+    async def send(self, channel: discord.abc.Messageable, *args, **kwargs) -> discord.Message:
+        """Pace a message to `channel`, then send it once a send slot is free."""
+        await self.pace(channel)
+        async with self.semaphore:
+            return await channel.send(*args, **kwargs)
+
+    async def dispatch(self, key, deliveries: Iterable[Callable[[], Awaitable[bool]]]) -> DeliveryReport:
+        """Run every delivery concurrently and report how long each took.
+
+        Each delivery returns whether it succeeded.  Exceptions are counted as
+        failures and logged so one bad channel can't stop the others.
+        """
+        deliveries = list(deliveries)
+        report = DeliveryReport(key, len(deliveries))
+
+        async def run(delivery):
+            try:
+                success = await delivery()
+            except Exception:
+                logger.exception("Error delivering %s", key)
+                success = False
+            if success:
+                report.delivered += 1
+                report.latencies.append(time.monotonic() - report.started)
+            else:
+                report.failed += 1
+
+        await asyncio.gather(*(run(delivery) for delivery in deliveries))
+        self.reports.append(report)
+        logger.debug(str(report))
+        return report
@@ -0,0 +1,43 @@
+from collections import OrderedDict
+from typing import Hashable, List, NamedTuple, Optional
+
+import discord
+
+
+class Render(NamedTuple):
+    embeds: List[discord.Embed]
+    message_text: Optional[str]
+    is_comment: bool
+
+
+class RenderCache:
+    """A small LRU cache of finished notification renders.
+
+    Renders are keyed by the content a notification points at, so duplicate
+    notifications about the same post, media, announcement or comment reuse
+    the same embeds instead of fetching and translating it again.
+    """
+
+    def __init__(self, max_size: int = 64):
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+        self._renders: 'OrderedDict[Hashable, Render]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._renders)
+
+    def get(self, key: Hashable) -> Optional[Render]:
+        if key not in self._renders:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._renders.move_to_end(key)
+        return self._renders[key]
+
+    def put(self, key: Hashable, render: Render) -> None:
+        self._renders[key] = render
+        self._renders.move_to_end(key)
+        while len(self._renders) > self.max_size:
+            self._renders.popitem(last=False)
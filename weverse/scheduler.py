@@ -0,0 +1,73 @@
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, NamedTuple, Optional
+
+
+class PollMetrics(NamedTuple):
+    started: float
+    duration: float
+    found: int
+    failed: bool
+
+
+class AdaptiveScheduler:
+    """Decide how long to wait between Weverse polls.
+
+    Polls run every `min_interval` seconds while any community has posted in
+    the last `active_window` seconds.  Each empty poll after that doubles the
+    wait up to `max_interval`.  Failed polls back off exponentially from
+    `failure_backoff` up to `max_failure_backoff`, with jitter so restarts
+    don't line up.
+    """
+
+    def __init__(self, min_interval: float = 15, max_interval: float = 120, active_window: float = 15 * 60,
+                 failure_backoff: float = 30, max_failure_backoff: float = 15 * 60, history: int = 100):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.active_window = active_window
+        self.failure_backoff = failure_backoff
+        self.max_failure_backoff = max_failure_backoff
+
+        self.idle_polls = 0
+        self.failures = 0
+        self.activity: Dict[str, float] = {}
+        self.polls: Deque[PollMetrics] = deque(maxlen=history)
+        self.lags: Deque[float] = deque(maxlen=history)
+
+    def record_activity(self, community_name: str, when: float = None) -> None:
+        self.activity[community_name.lower()] = time.time() if when is None else when
+
+    def record_lag(self, lag: float) -> None:
+        self.lags.append(lag)
+
+    def record_poll(self, started: float, duration: float, found: int = 0, failed: bool = False) -> None:
+        self.polls.append(PollMetrics(started, duration, found, failed))
+        if failed:
+            self.failures += 1
+            return
+        self.failures = 0
+        if found:
+            self.idle_polls = 0
+        else:
+            self.idle_polls += 1
+
+    def active_communities(self, now: float = None) -> Dict[str, float]:
+        if now is None:
+            now = time.time()
+        return {name: ts for name, ts in self.activity.items() if now - ts < self.active_window}
+
+    def next_interval(self, now: float = None) -> float:
+        if self.failures:
+            backoff = min(self.failure_backoff * 2 ** (self.failures - 1), self.max_failure_backoff)
+            return backoff * random.uniform(.5, 1.5)
+        if self.active_communities(now):
+            interval = self.min_interval
+        else:
+            interval = min(self.min_interval * 2 ** self.idle_polls, self.max_interval)
+        return interval * random.uniform(.9, 1.1)
+
+    def average_lag(self) -> Optional[float]:
+        if not self.lags:
+            return None
+        return sum(self.lags) / len(self.lags)
@@ -0,0 +1,80 @@
+import time
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_MAX_SIZE = 5000
+DEFAULT_MAX_AGE = 30 * 24 * 60 * 60  # 30 days
+
+
+class SeenStore:
+    """A bounded window of seen notification IDs held in memory.
+
+    The window is loaded once from Config, checked with O(1) set lookups and
+    only written back when it has changed.  Entries are evicted once there are
+    more than `max_size` of them or they are older than `max_age` seconds.
+    Writing the window costs time proportional to its size, so a poll that
+    finds something new costs at most a `max_size` write, and an idle poll
+    costs nothing.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_SIZE, max_age: float = DEFAULT_MAX_AGE):
+        self.max_size = max_size
+        self.max_age = max_age
+
+        self.loaded = False
+        self.dirty = False
+        # Dicts keep insertion order, so the oldest IDs are always first
+        self._seen: Dict[Any, float] = {}
+
+    def __contains__(self, notif_id) -> bool:
+        return notif_id in self._seen
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def load(self, window: Iterable[Tuple[Any, float]], legacy: Iterable[Any] = (), now: float = None) -> None:
+        """Load the stored window, merging in IDs from the old flat `seen` list."""
+        if now is None:
+            now = time.time()
+        self._seen = {notif_id: ts for notif_id, ts in window}
+        for notif_id in legacy:
+            if notif_id not in self._seen:
+                self._seen[notif_id] = now
+                self.dirty = True
+        self.loaded = True
+        self.evict(now)
+        # Copy what's left so a large eviction doesn't leave a sparse dict behind
+        self._seen = dict(self._seen)
+
+    def add(self, notif_id, now: float = None) -> None:
+        if notif_id in self._seen:
+            return
+        self._seen[notif_id] = time.time() if now is None else now
+        self.dirty = True
+        if len(self._seen) > self.max_size:
+            del self._seen[next(iter(self._seen))]
+
+    def evict(self, now: Optional[float] = None) -> None:
+        """Drop entries that are too old or that overflow the window."""
+        if now is None:
+            now = time.time()
+        cutoff = now - self.max_age
+        stale = []
+        # IDs are added in time order, so the stale ones are all at the front
+        for notif_id, ts in self._seen.items():
+            if ts >= cutoff:
+                break
+            stale.append(notif_id)
+        for notif_id in stale:
+            del self._seen[notif_id]
+        overflow = len(self._seen) - self.max_size
+        if overflow > 0:
+            for notif_id in list(islice(self._seen, overflow)):
+                del self._seen[notif_id]
+        if stale or overflow > 0:
+            self.dirty = True
+
+    def dump(self) -> List[List[Any]]:
+        """Return the window in the form it's saved to Config and mark it clean."""
+        self.dirty = False
+        return [[notif_id, ts] for notif_id, ts in self._seen.items()]
@@ -0,0 +1,74 @@
+import asyncio
+from collections import Counter
+from typing import Dict, Optional
+
+import aiohttp
+
+
+class SessionManager:
+    """Own a single pooled aiohttp session for everything the cog requests.
+
+    The session is created lazily inside the running loop with a tuned
+    connector, and is reused across client re-inits so reconnecting doesn't
+    open a fresh pool each time.  Connection and DNS cache events are counted
+    so the pool's behaviour can be checked from Discord.
+    """
+
+    def __init__(self, limit: int = 50, limit_per_host: int = 10, keepalive_timeout: float = 60,
+                 ttl_dns_cache: int = 300, timeout: float = 30):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self.timeout = timeout
+
+        self.counts = Counter()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> aiohttp.ClientSession:
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                self._session = self._make_session()
+                self.counts['sessions'] += 1
+            return self._session
+
+    def _make_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.limit_per_host,
+                                         keepalive_timeout=self.keepalive_timeout,
+                                         ttl_dns_cache=self.ttl_dns_cache)
+        return aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout),
+                                     trace_configs=[self._trace_config()])
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+
+        def counter(name):
+            async def count(session, context, params):
+                self.counts[name] += 1
+
+            return count
+
+        trace_config.on_request_start.append(counter('requests'))
+        trace_config.on_request_exception.append(counter('errors'))
+        trace_config.on_connection_create_end.append(counter('opened'))
+        trace_config.on_connection_reuseconn.append(counter('reused'))
+        trace_config.on_dns_cache_hit.append(counter('dns_hits'))
+        trace_config.on_dns_cache_miss.append(counter('dns_misses'))
+        return trace_config
+
+    async def close(self) -> None:
+        async with self._lock:
+            if self._session is not None:
+                await self._session.close()
+            self._session = None
+
+    def stats(self) -> Dict[str, int]:
+        return {key: self.counts[key]
+                for key in ('sessions', 'requests', 'errors', 'opened', 'reused', 'dns_hits', 'dns_misses')}
+
+    def __str__(self):
+        stats = self.stats()
+        return (f"{stats['requests']} requests ({stats['errors']} errors),"
+                f" {stats['opened']} connections opened, {stats['reused']} reused,"
+                f" DNS cache {stats['dns_hits']} hits / {stats['dns_misses']} misses")
@@ -0,0 +1,44 @@
+from typing import Any, Dict, List, NamedTuple
+
+
+class Subscription(NamedTuple):
+    channel_id: int
+    role_id: int
+    show_comments: bool
+
+
+class SubscriptionIndex:
+    """A reverse index from lowercased community name to the channels subscribed to it.
+
+    The index is built once from Config and then kept in sync by the commands
+    that change subscriptions, so routing a notification is a dict lookup.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._index: Dict[str, Dict[int, Subscription]] = {}
+
+    def build(self, all_channels: Dict[int, Dict[str, Any]]) -> None:
+        self._index = {}
+        for channel_id, data in all_channels.items():
+            for community_name, conf in data['channels'].items():
+                self.set(community_name, channel_id, conf['role_id'], conf['show_comments'])
+        self.loaded = True
+
+    def get(self, community_name: str) -> List[Subscription]:
+        return list(self._index.get(community_name.lower(), {}).values())
+
+    def set(self, community_name: str, channel_id: int, role_id: int, show_comments: bool) -> None:
+        community = self._index.setdefault(community_name.lower(), {})
+        community[channel_id] = Subscription(channel_id, role_id, show_comments)
+
+    def remove(self, community_name: str, channel_id: int) -> None:
+        community = self._index.get(community_name.lower(), {})
+        community.pop(channel_id, None)
+        if not community:
+            self._index.pop(community_name.lower(), None)
+
+    def remove_channel(self, channel_id: int) -> None:
+        """Drop a channel from every community, e.g. once it's been deleted."""
+        for community_name in [name for name, community in self._index.items() if channel_id in community]:
+            self.remove(community_name, channel_id)
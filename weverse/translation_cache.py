@@ -0,0 +1,104 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger('red.aradiacogs.weverse.translation_cache')
+
+DEFAULT_TTL = 7 * 24 * 60 * 60  # 7 days
+DEFAULT_MAX_SIZE = 2000
+
+
+class TranslationCache:
+    """A disk-backed cache of translations keyed by a hash of the source text.
+
+    Entries expire after `ttl` seconds and the least recently used entries are
+    dropped past `max_size`.  The cache is saved to a JSON file so it survives
+    cog reloads.
+    """
+
+    def __init__(self, path: Path, ttl: float = DEFAULT_TTL, max_size: int = DEFAULT_MAX_SIZE):
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+        self.dirty = False
+        self._cache: 'OrderedDict[str, List]' = OrderedDict()
+
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def __contains__(self, text: str) -> bool:
+        entry = self._cache.get(self.key(text))
+        return entry is not None and entry[1] > time.time() - self.ttl
+
+    def get(self, text: str) -> Optional[str]:
+        key = self.key(text)
+        if text not in self:
+            self._cache.pop(key, None)
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._cache.move_to_end(key)
+        return self._cache[key][0]
+
+    def put(self, text: str, translation: str) -> None:
+        key = self.key(text)
+        self._cache[key] = [translation, time.time()]
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_size:
+            self._cache.popitem(last=False)
+        self.dirty = True
+
+    def missing(self, texts: Iterable[str]) -> List[str]:
+        """Return the distinct texts that don't have a cached translation."""
+        return list(OrderedDict.fromkeys(text for text in texts if text and text not in self))
+
+    def load(self) -> None:
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                self._cache = OrderedDict(json.load(f))
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            logger.exception("Unable to load the translation cache.  Starting with an empty one.")
+            return
+        cutoff = time.time() - self.ttl
+        for key in [key for key, (_, ts) in self._cache.items() if ts <= cutoff]:
+            del self._cache[key]
+
+    def save(self) -> None:
+        """Write the cache to disk if it's changed.  Errors are logged rather than raised."""
+        if not self.dirty:
+            return
+        self.dirty = False
+        if not self._write(json.dumps(self._cache, ensure_ascii=False)):
+            self.dirty = True
+
+    async def flush(self) -> None:
+        """Like `save`, but writes the file in an executor so the event loop isn't blocked."""
+        if not self.dirty:
+            return
+        self.dirty = False
+        data = json.dumps(self._cache, ensure_ascii=False)
+        if not await asyncio.get_running_loop().run_in_executor(None, self._write, data):
+            self.dirty = True
+
+    def _write(self, data: str) -> bool:
+        tmp_path = self.path.with_suffix('.tmp')
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            logger.exception("Unable to save the translation cache.")
+            return False
+        return True
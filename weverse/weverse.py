@@ -1,6 +1,9 @@
 import asyncio
 import logging
 import random
+import time
+from datetime import datetime
+from functools import partial
 from io import BytesIO
 from typing import Optional
 
@@ -8,10 +11,30 @@ import aiohttp
 import discord
 from Weverse import WeverseClientAsync
 from redbot.core import Config, commands
-from redbot.core.utils.chat_formatting import humanize_list, inline, pagify
+from redbot.core.data_manager import cog_data_path
+from redbot.core.utils.chat_formatting import box, humanize_list, inline, pagify
+
+from weverse.community_index import CommunityIndex, normalize
+from weverse.delivery_queue import Delivery, DeliveryQueue
+from weverse.dispatcher import DeliveryDispatcher
+from weverse.render_cache import Render, RenderCache
+from weverse.scheduler import AdaptiveScheduler
+from weverse.seen_store import SeenStore
+from weverse.session import SessionManager
+from weverse.subscriptions import Subscription, SubscriptionIndex
+from weverse.translation_cache import TranslationCache
 
 logger = logging.getLogger('red.aradiacogs.weverse')
 
+FOOTER_TEXT = "💢Do .weverse for help💜"
+FOOTER_ICON = 'https://cdn.discordapp.com/attachments/574296586742398997/870106439178403840/ezgif-2-441a54352e45.gif'
+AUTHOR_URL = "https://top.gg/bot/388331085060112397/"
+AUTHOR_ICON = 'https://cdn.discordapp.com/attachments/574296586742398997/870104878310129744/weverse.png'
+
+# Papago accepts up to 5000 characters per request
+TRANSLATION_BATCH_SIZE = 4500
+TRANSLATION_SEPARATOR = "\n\n⁂\n\n"
+
 
 class Weverse(commands.Cog):
     def __init__(self, bot, *args, **kwargs):
@@ -19,12 +42,22 @@ class Weverse(commands.Cog):
         self.bot = bot
 
         self.config = Config.get_conf(self, identifier=7373253)
-        self.config.register_global(token=None, seen=[])
+        self.config.register_global(token=None, seen=[], seen_window=[], delivery_queue=[], dead_letters=[])
         self.config.register_channel(channels={})
 
         self.weverse_client: Optional[WeverseClientAsync] = None
-        self.session = aiohttp.ClientSession()
+        self.seen = SeenStore()
+        self.subscriptions = SubscriptionIndex()
+        self.communities = CommunityIndex()
+        self.dispatcher = DeliveryDispatcher()
+        self.queue = DeliveryQueue()
+        self.scheduler = AdaptiveScheduler()
+        self.renders = RenderCache()
+        self.translations = TranslationCache(cog_data_path(self) / 'translations.json')
+        self.translations.load()
+        self.sessions = SessionManager()
         self.ready = asyncio.Event()
+        self.init_lock = asyncio.Lock()
 
         bot.loop.create_task(self.init())
         self._loop = bot.loop.create_task(self.run_loop())
@@ -38,16 +71,19 @@ class Weverse(commands.Cog):
                                                        f" <token>`.  Instructions on how to get an authorization token"
                                                        f" can be found at https://pastebin.com/raw/pBvn2KsX.")
                 return
-        self.weverse_client = WeverseClientAsync(authorization=await self.config.token(),
-                                                 web_session=self.session,
-                                                 verbose=True, loop=self.bot.loop)
-        try:
-            await self.weverse_client.start()
-        except Exception:
+        async with self.init_lock:
+            # Stop polling and commands from using the old client while the new one loads
+            self.ready.clear()
             self.weverse_client = None
-            raise
-        finally:
-            self.ready.set()
+            client = WeverseClientAsync(authorization=await self.config.token(),
+                                        web_session=await self.sessions.get(),
+                                        verbose=True, loop=self.bot.loop)
+            try:
+                await client.start()
+                self.communities.build(client.all_communities.values())
+                self.weverse_client = client
+            finally:
+                self.ready.set()
 
     async def wait_until_ready(self, ctx):
         await self.ready.wait()
@@ -73,20 +109,23 @@ class Weverse(commands.Cog):
 
     def cog_unload(self):
         self._loop.cancel()
-        self.bot.loop.create_task(self.session.close())
+        self.bot.loop.create_task(self.sessions.close())
+        self.translations.save()
 
     async def run_loop(self):
         await self.bot.wait_until_red_ready()
         await asyncio.sleep(10)
         while True:
+            started = time.time()
             try:
-                await self.update_weverse()
-                await asyncio.sleep(2)
+                found = await self.update_weverse()
+                self.scheduler.record_poll(started, time.time() - started, found)
             except asyncio.CancelledError:
                 break
             except Exception:
                 logger.exception("Error in loop")
-            await asyncio.sleep(30)
+                self.scheduler.record_poll(started, time.time() - started, failed=True)
+            await asyncio.sleep(self.scheduler.next_interval())
 
     @commands.group()
     async def weverse(self, ctx):
@@ -116,6 +155,42 @@ class Weverse(commands.Cog):
         await self.init()
         await ctx.tick()
 
+    @weverse.command()
+    @commands.is_owner()
+    async def stats(self, ctx):
+        """Show polling metrics and delivery latency for recent notifications."""
+        polls = list(self.scheduler.polls)
+        if not polls:
+            await ctx.send("Weverse hasn't been polled since the cog was loaded.")
+            return
+        lines = [
+            f"Polls: {len(polls)} ({sum(poll.failed for poll in polls)} failed)",
+            f"Average poll duration: {sum(poll.duration for poll in polls) / len(polls):.2f}s",
+            f"Notifications found: {sum(poll.found for poll in polls)}",
+            f"Active communities: {humanize_list(list(self.scheduler.active_communities())) or 'None'}",
+            f"Next poll in: ~{self.scheduler.next_interval():.0f}s",
+        ]
+        if (lag := self.scheduler.average_lag()) is not None:
+            lines.append(f"End-to-end lag: {lag:.1f}s average, {max(self.scheduler.lags):.1f}s max")
+        lines.append(f"HTTP: {self.sessions}")
+        lines.extend(str(report) for report in list(self.dispatcher.reports)[-10:])
+        await ctx.send(box('\n'.join(lines)))
+
+    @weverse.command(name="queue")
+    @commands.is_owner()
+    async def weverse_queue(self, ctx):
+        """Show deliveries waiting to be retried and ones that failed permanently."""
+        now = time.time()
+        lines = [f"Pending: {len(self.queue.pending)}"]
+        if (oldest := self.queue.oldest()) is not None:
+            lines.append(f"Oldest pending: {now - oldest.created:.0f}s ({oldest.error})")
+        if (due := min((d.next_try for d in self.queue.pending), default=None)) is not None:
+            lines.append(f"Next retry in: {max(due - now, 0):.0f}s")
+        lines.append(f"Dead letters: {len(self.queue.dead_letters)}")
+        for delivery in self.queue.dead_letters[-5:]:
+            lines.append(f"  {delivery.notif_id} -> {delivery.channel_id}: {delivery.error}")
+        await ctx.send(box('\n'.join(lines)))
+
     @weverse.command(name="add")
     @commands.guild_only()
     @commands.has_guild_permissions(manage_messages=True)
@@ -134,26 +209,31 @@ class Weverse(commands.Cog):
         else:
             role_id = role.id
 
-        community_name = community_name.lower()
+        if (community := self.communities.get(community_name)) is None:
+            suggestions = self.communities.search(community_name)
+            if suggestions:
+                await ctx.send(f"I could not find {community_name}. Did you mean "
+                               f"{humanize_list([inline(name) for name in suggestions], style='or')}?")
+            else:
+                await ctx.send(f"I could not find {community_name}.")
+            return
+        community_name = community.name.lower()
 
         async with self.config.channel(channel).channels() as chans:
             if community_name in chans:
                 if role_id != chans[community_name]['role_id']:
                     chans[community_name]['role_id'] = role_id
+                    self.update_subscription(community_name, channel, chans[community_name])
                     await ctx.send(f"Role updated for community `{community_name}`.")
                     return
 
-            for community in self.weverse_client.all_communities.values():
-                if community.name.lower() == community_name:
-                    chans[community_name] = {
-                        'role_id': role_id,
-                        'show_comments': True,
-                    }
+            chans[community_name] = {
+                'role_id': role_id,
+                'show_comments': True,
+            }
+            self.update_subscription(community_name, channel, chans[community_name])
 
-                    await ctx.send(f"You will now receive weverse updates for {community.name}.")
-                    return
-            available = humanize_list([inline(com.name) for com in self.weverse_client.all_communities.values()])
-            await ctx.send(f"I could not find {community_name}. Available choices are:\n" + available)
+        await ctx.send(f"You will now receive weverse updates for {community.name}.")
 
     @weverse.command(name="remove")
     @commands.guild_only()
@@ -167,10 +247,12 @@ class Weverse(commands.Cog):
             channel = ctx.channel
 
         async with self.config.channel(channel).channels() as chans:
-            if community_name not in chans:
+            if (community_name := self.find_subscription(chans, community_name)) is None:
                 await ctx.send("This community is not set up to notify the channel.")
                 return
             del chans[community_name]
+        if self.subscriptions.loaded:
+            self.subscriptions.remove(community_name, channel.id)
         await ctx.send(f"You will no longer receive weverse updates for {community_name}.")
 
     @weverse.command(name="list")
@@ -203,69 +285,158 @@ class Weverse(commands.Cog):
             channel = ctx.channel
 
         async with self.config.channel(channel).channels() as chans:
-            if community_name not in chans:
+            if (community_name := self.find_subscription(chans, community_name)) is None:
                 await ctx.send("This community is not set up to notify the channel.")
                 return
             chans[community_name]['show_comments'] = enable
+            self.update_subscription(community_name, channel, chans[community_name])
         await ctx.send(f"You will {'now' if enable else 'no longer'} recieve"
                        f" comment notifications from {community_name}.")
 
-    async def update_weverse(self):
-        """Process for checking for Weverse updates and sending to discord channels."""
+    @staticmethod
+    def find_subscription(chans, community_name) -> Optional[str]:
+        """Find a channel's stored community name, matching it the same way `weverse add` does."""
+        key = normalize(community_name)
+        return next((name for name in chans if normalize(name) == key), None)
+
+    async def load_seen(self):
+        """Load the seen notification window, migrating the old flat `seen` list if it exists."""
+        self.seen.load(await self.config.seen_window(), await self.config.seen())
+        if self.seen.dirty:
+            await self.flush_seen()
+            await self.config.seen.set([])
+
+    async def flush_seen(self):
+        """Write the seen notification window to Config if it's changed.
+
+        Old entries are only evicted along with a write that's happening anyway,
+        so they don't cause a write of their own on every poll.
+        """
+        if self.seen.dirty:
+            self.seen.evict()
+            await self.config.seen_window.set(self.seen.dump())
+
+    async def load_queue(self):
+        self.queue.load(await self.config.delivery_queue(), await self.config.dead_letters())
+
+    async def flush_queue(self):
+        """Write the delivery queue to Config if it's changed."""
+        if self.queue.pending_dirty:
+            await self.config.delivery_queue.set(self.queue.dump_pending())
+        if self.queue.dead_letters_dirty:
+            await self.config.dead_letters.set(self.queue.dump_dead_letters())
+
+    def update_subscription(self, community_name, channel, conf):
+        """Keep the subscription index in sync with a channel's config."""
+        if self.subscriptions.loaded:
+            self.subscriptions.set(community_name, channel.id, conf['role_id'], conf['show_comments'])
+
+    async def update_weverse(self) -> int:
+        """Process for checking for Weverse updates and sending to discord channels.
+
+        Returns the number of new notifications found for subscribed communities.
+        """
         if self.weverse_client is None or not self.weverse_client.cache_loaded:
-            return
+            return 0
+        if not self.seen.loaded:
+            await self.load_seen()
+        if not self.subscriptions.loaded:
+            self.subscriptions.build(await self.config.all_channels())
+        if not self.queue.loaded:
+            await self.load_queue()
+
+        try:
+            await self.retry_deliveries()
+            return await self.process_notifications()
+        finally:
+            await self.flush_seen()
+            await self.flush_queue()
+            await self.translations.flush()
 
+    async def process_notifications(self) -> int:
         await self.weverse_client.check_new_user_notifications()
-        await asyncio.sleep(2)
 
-        allchans = await self.config.all_channels()
+        notifs = [notif for notif in self.weverse_client.get_new_notifications()
+                  if (notif.community_name or notif.bold_element) and notif.id not in self.seen]
+        await self.prefetch_translations([self.notification_body(notif) for notif in notifs
+                                          if self.subscriptions.get(notif.community_name or notif.bold_element)])
 
-        for notif in self.weverse_client.get_new_notifications():
+        found = 0
+        for notif in notifs:
             community_name = notif.community_name or notif.bold_element
-            if not community_name or notif.id in await self.config.seen():
+            if notif.id in self.seen:
                 continue
-            async with self.config.seen() as seen:
-                seen.append(notif.id)
-            await asyncio.sleep(1)
+            self.seen.add(notif.id)
 
-            channels = [(c_id, data['channels'][community_name.lower()])
-                        for c_id, data in allchans.items()
-                        if community_name.lower() in data['channels']]
-
-            if not channels:
+            # The client follows every community, so only subscribed ones count towards polling faster
+            if not (subscriptions := self.subscriptions.get(community_name)):
                 continue
+            found += 1
+            self.scheduler.record_activity(community_name)
 
-            noti_type = self.weverse_client.determine_notification_type(notif.message)
-            embed_title = f"New {community_name} Notification!"
-            is_comment = False
-            message_text = None
-            if noti_type == 'comment':
-                is_comment = True
-                embed = await self.set_comment_embed(notif, embed_title)
-            elif noti_type == 'post':
-                embed, message_text = await self.set_post_embed(notif, embed_title)
-            elif noti_type == 'media':
-                embed, message_text = await self.set_media_embed(notif, embed_title)
-            elif noti_type == 'announcement':
-                embed_list = await self.set_announcement_embed(notif, embed_title)
-            else:
+            if not (render := await self.render_notification(notif, community_name)):
                 continue
 
-            if not embed:
-                continue
+            report = await self.dispatcher.dispatch(notif.id, [
+                partial(self.send_weverse_to_channel, self.make_delivery(notif.id, subscription, render))
+                for subscription in subscriptions
+                if not render.is_comment or subscription.show_comments
+            ])
+            if report.delivered and (notified_at := self.notification_time(notif)) is not None:
+                self.scheduler.record_lag(time.time() - notified_at)
+        return found
+
+    def notification_time(self, notification) -> Optional[float]:
+        """Get when Weverse sent a notification as a timestamp, if it can be parsed."""
+        try:
+            return datetime.fromisoformat(notification.notified_at).timestamp()
+        except (AttributeError, TypeError, ValueError):
+            return None
 
-            for channel_id, data in channels:
-                if embed:
-                    await self.send_weverse_to_channel(channel_id, data, message_text, embed, is_comment,
-                                                       community_name)
-                    continue
+    async def retry_deliveries(self):
+        """Retry every queued delivery whose backoff has passed."""
+        if not (due := self.queue.due()):
+            return
+        await self.dispatcher.dispatch('retries', [partial(self.send_weverse_to_channel, delivery)
+                                                   for delivery in due])
+
+    async def render_notification(self, notification, community_name) -> Optional[Render]:
+        """Render a notification's embeds and attachment text, reusing a cached render if there is one."""
+        noti_type = self.weverse_client.determine_notification_type(notification.message)
+        # The message is part of the embed, so it's part of the key too
+        key = (notification.community_id, notification.contents_id, noti_type, notification.message)
+        if (render := self.renders.get(key)) is not None:
+            return render
+
+        embed_title = f"New {community_name} Notification!"
+        message_text = None
+        if noti_type == 'comment':
+            embed = await self.set_comment_embed(notification, embed_title)
+            embeds = [embed] if embed else []
+        elif noti_type == 'post':
+            embed, message_text = await self.set_post_embed(notification, embed_title)
+            embeds = [embed] if embed else []
+        elif noti_type == 'media':
+            embed, message_text = await self.set_media_embed(notification, embed_title)
+            embeds = [embed] if embed else []
+        elif noti_type == 'announcement':
+            embeds = await self.set_announcement_embed(notification, embed_title) or []
+        else:
+            return None
 
-                embed = embed_list
-                for embed_single in embed:
-                    embed = embed_single
-                    await self.send_weverse_to_channel(channel_id, data, message_text, embed, is_comment,
-                                                       community_name)
-                    continue
+        if not embeds:
+            return None
+        render = Render(embeds, message_text, noti_type == 'comment')
+        self.renders.put(key, render)
+        return render
+
+    def make_embed(self, title, description) -> discord.Embed:
+        """Make an embed with the shared Weverse colour, footer and author."""
+        embed = discord.Embed(title=title, description=description,
+                              color=discord.Color(random.randint(0x000000, 0xffffff)))
+        embed.set_footer(text=FOOTER_TEXT, icon_url=FOOTER_ICON)
+        embed.set_author(name="Weverse", url=AUTHOR_URL, icon_url=AUTHOR_ICON)
+        return embed
 
     async def set_comment_embed(self, notification, embed_title):
         """Set Comment Embed for Weverse."""
@@ -282,15 +453,7 @@ class Weverse(commands.Cog):
         embed_description = (f"**{notification.message}**\n\n"
                              f"Content: **{comment_body}**" +
                              (f"\nTranslated Content: **{translation}**" if translation else ""))
-        embed = discord.Embed(title=embed_title, description=embed_description,
-                              color=discord.Color(random.randint(0x000000, 0xffffff)))
-        embed.set_footer(text="💢Do .weverse for the help💜",
-                         icon_url='https://cdn.discordapp.com/attachments/574296586742398997/870106439178403840/ezgif-2-441a54352e45.gif')
-        embed.set_author(name="Weverse", url="https://top.gg/bot/388331085060112397/",
-                         icon_url='https://cdn.discordapp.com/attachments/574296586742398997/870104878310129744/weverse.png')
-        return embed
-        await asyncio.sleep(1)
-        return None
+        return self.make_embed(embed_title, embed_description)
 
     async def set_post_embed(self, notification, embed_title):
         """Set Post Embed for Weverse."""
@@ -303,15 +466,9 @@ class Weverse(commands.Cog):
                                  f"Artist: **{post.artist.name} ({post.artist.list_name[0]})**\n"
                                  f"Content: **{post.body}**" +
                                  (f"\nTranslated Content: **{translation}**" if translation else ""))
-            embed = discord.Embed(title=embed_title, description=embed_description,
-                                  color=discord.Color(random.randint(0x000000, 0xffffff)))
-            embed.set_footer(text="💢Do .weverse for help💜",
-                             icon_url='https://cdn.discordapp.com/attachments/574296586742398997/870106439178403840/ezgif-2-441a54352e45.gif')
-            embed.set_author(name="Weverse", url="https://top.gg/bot/388331085060112397/",
-                             icon_url='https://cdn.discordapp.com/attachments/574296586742398997/870104878310129744/weverse.png')
+            embed = self.make_embed(embed_title, embed_description)
             message = "\n".join(photo.original_img_url for photo in post.photos)
             return embed, message
-            await asyncio.sleep(1)
         return None, None
 
     async def set_media_embed(self, notification, embed_title):
@@ -320,16 +477,11 @@ class Weverse(commands.Cog):
         if media:
             translation = await self.translate(media.body)
 
-            embed_description = (f"**{notification.message}**\n\n" \
-                                 f"Title: **{media.title}**\n" \
+            embed_description = (f"**{notification.message}**\n\n"
+                                 f"Title: **{media.title}**\n"
                                  f"Content: **{media.body}**\n" +
                                  (f"\nTranslated Content: **{translation}**" if translation else ""))
-            embed = discord.Embed(title=embed_title, description=embed_description,
-                                  color=discord.Color(random.randint(0x000000, 0xffffff)))
-            embed.set_footer(text="💢Do .weverse for help💜",
-                             icon_url='https://cdn.discordapp.com/attachments/574296586742398997/870106439178403840/ezgif-2-441a54352e45.gif')
-            embed.set_author(name="Weverse", url="https://top.gg/bot/388331085060112397/",
-                             icon_url='https://cdn.discordapp.com/attachments/574296586742398997/870104878310129744/weverse.png')
+            embed = self.make_embed(embed_title, embed_description)
             video_link = media.video_link
 
             message = "\n".join(photo.original_img_url for photo in media.photos)
@@ -337,7 +489,6 @@ class Weverse(commands.Cog):
             if video_link:
                 message = f"{message}\n{video_link}"
 
-            await asyncio.sleep(1)
             return embed, message
         return None, None
 
@@ -355,39 +506,116 @@ class Weverse(commands.Cog):
                                 f"Content: **{announcement.content}**"
             embed_list = []
             for text in pagify(embed_description):
-                images_url = announcement.image_url
-                em = discord.Embed(title=embed_title, description=None,
-                                   color=discord.Color(random.randint(0x000000, 0xffffff)))
-                em.set_image(url=images_url)
-                em.set_footer(text="💢Do .weverse for help💜",
-                              icon_url='https://cdn.discordapp.com/attachments/574296586742398997/870106439178403840/ezgif-2-441a54352e45.gif')
-                em.set_author(name="Weverse", url="https://top.gg/bot/388331085060112397/",
-                              icon_url='https://cdn.discordapp.com/attachments/574296586742398997/870104878310129744/weverse.png')
-                em.description = text
-                embed.append(em)
-                return embed
+                em = self.make_embed(embed_title, text)
+                em.set_image(url=announcement.image_url)
+                embed_list.append(em)
+            return embed_list
         return None
 
-    async def send_weverse_to_channel(self, channel_id, channel_data, message_text, embed, is_comment, community_name):
-        role_id = channel_data['role_id']
-        comments_enabled = channel_data['show_comments']
-        if not is_comment or comments_enabled:
-            channel = self.bot.get_channel(channel_id)
-            try:
-                mention_role = f"<@&{role_id}>" if role_id else None
-                await channel.send(mention_role, embed=embed, allowed_mentions=discord.AllowedMentions(roles=True))
-                await asyncio.sleep(1)
-                if message_text:
-                    await channel.send(message_text)
-                    await asyncio.sleep(1)
-            except Exception:
-                pass
+    def make_delivery(self, notif_id, subscription: Subscription, render: Render) -> Delivery:
+        mention_role = f"<@&{subscription.role_id}>" if subscription.role_id else None
+        messages = [(mention_role, embed) for embed in render.embeds]
+        if render.message_text:
+            messages.append((render.message_text, None))
+        return Delivery(notif_id, subscription.channel_id, messages)
+
+    async def send_weverse_to_channel(self, delivery: Delivery) -> bool:
+        """Send the rest of a delivery's messages, queueing it for a retry if Discord fails."""
+        if (channel := self.bot.get_channel(delivery.channel_id)) is None:
+            # The channel may be deleted, but its guild may also just be unavailable for a while
+            self.queue.retry(delivery, "Channel not found")
+            return False
+        try:
+            while delivery.sent < len(delivery.messages):
+                content, embed = delivery.messages[delivery.sent]
+                await self.dispatcher.send(channel, content, embed=embed,
+                                           allowed_mentions=discord.AllowedMentions(roles=True))
+                delivery.sent += 1
+        except discord.NotFound as e:
+            self.channel_gone(delivery, e)
+            return False
+        except discord.Forbidden as e:
+            self.queue.dead_letter(delivery, e)
+            return False
+        except discord.HTTPException as e:
+            if e.status >= 500 or e.status == 429:
+                self.queue.retry(delivery, e)
+            else:
+                self.queue.dead_letter(delivery, e)
+            return False
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            self.queue.retry(delivery, e)
+            return False
+        self.queue.complete(delivery)
+        return True
+
+    def channel_gone(self, delivery: Delivery, error) -> None:
+        """Dead-letter a delivery to a deleted channel and stop routing anything else to it.
+
+        The channel is only dropped from the in-memory index, so its config is
+        left alone.
+        """
+        logger.warning("Channel %s is gone, no longer sending to it: %s", delivery.channel_id, error)
+        self.queue.dead_letter(delivery, error)
+        self.queue.drop_channel(delivery.channel_id)
+        self.subscriptions.remove_channel(delivery.channel_id)
+
+    def notification_body(self, notification) -> Optional[str]:
+        """Get the text that will be translated for a notification, if it's already cached by the client.
+
+        Comment bodies have to be fetched, so they're translated when they're rendered instead.
+        """
+        noti_type = self.weverse_client.determine_notification_type(notification.message)
+        if noti_type == 'post':
+            content = self.weverse_client.get_post_by_id(notification.contents_id)
+            return content and content.body
+        elif noti_type == 'media':
+            content = self.weverse_client.get_media_by_id(notification.contents_id)
+            return content and content.body
+        elif noti_type == 'announcement':
+            content = self.weverse_client.get_announcement_by_id(notification.contents_id)
+            return content and content.content
+        return None
+
+    async def prefetch_translations(self, texts):
+        """Translate every uncached text in as few Papago requests as possible.
+
+        Texts are joined with a separator into batches.  If a batch doesn't
+        split back into the same number of texts, each one is translated on
+        its own instead.
+        """
+        batch = []
+        for text in self.translations.missing(texts):
+            if batch and len(TRANSLATION_SEPARATOR.join(batch + [text])) > TRANSLATION_BATCH_SIZE:
+                await self.translate_batch(batch)
+                batch = []
+            batch.append(text)
+        if batch:
+            await self.translate_batch(batch)
+
+    async def translate_batch(self, texts):
+        if len(texts) > 1 and (translation := await self.papago_translate(TRANSLATION_SEPARATOR.join(texts))):
+            parts = translation.split(TRANSLATION_SEPARATOR.strip())
+            if len(parts) == len(texts):
+                for text, part in zip(texts, parts):
+                    self.translations.put(text, part.strip())
+                return
+        for text in texts:
+            await self.translate(text)
 
     async def translate(self, text: str) -> Optional[str]:
+        if not text:
+            return None
+        if (translation := self.translations.get(text)) is not None:
+            return translation
+        if (translation := await self.papago_translate(text)) is not None:
+            self.translations.put(text, translation)
+        return translation
+
+    async def papago_translate(self, text: str) -> Optional[str]:
         if self.bot.get_cog("Papago"):
             try:
                 return await self.bot.get_cog("Papago").translate('ko', 'en', text)
-                await asyncio.sleep(1)
             except ValueError:
                 pass
             except Exception:
@@ -0,0 +1,340 @@
+"""Offline benchmark for the YouTubeUpdates polling path.
+
+Run with `python -m youtubeupdates.bench` from the repository root.  A local
+aiohttp server stands in for the YouTube Data API (search, playlistItems,
+channels and videos) and the uploads feed, and charges quota the same way
+YouTube does.  Each cycle publishes new uploads to random channels, then
+runs `YouTubeUpdates.do_loop` against the fake server with fake Discord
+channels, and reports API calls, quota units, wall time and Discord sends.
+"""
+import argparse
+import asyncio
+import copy
+import hashlib
+import json
+import random
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Dict, List
+from xml.sax.saxutils import escape
+
+import aiohttp
+from aiohttp import web
+
+from youtubeupdates.channel_index import ChannelIndex
+from youtubeupdates.delivery import DeliveryStats
+from youtubeupdates.quota import ENDPOINT_COSTS, PollScheduler
+from youtubeupdates.seen_ring import SeenRing
+from youtubeupdates.youtubeupdates import SEND_CONCURRENCY, YouTubeUpdates
+from youtubeupdates.yt_api import YouTubeAPI
+
+FEED_ENTRY = """  <entry>
+    <yt:videoId>{video_id}</yt:videoId>
+    <yt:channelId>{channel_id}</yt:channelId>
+    <title>{title}</title>
+    <published>{published}</published>
+    <media:group>
+      <media:thumbnail url="https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"/>
+      <media:description>{description}</media:description>
+    </media:group>
+  </entry>
+"""
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns:media="http://search.yahoo.com/mrss/"
+      xmlns="http://www.w3.org/2005/Atom">
+{entries}</feed>
+"""
+
+
+class FakeYouTube:
+    """Serves generated channels and uploads in the shape of the YouTube Data API.
+
+    Quota is charged per call like the real API, with search at 100 units
+    and everything else at 1.  The uploads feed is free.  Each response has
+    an ETag for the whole list and honours If-None-Match, so the metadata
+    cache can revalidate.
+    """
+
+    def __init__(self, channels: int, uploads: int, latency: float = 0):
+        self.latency = latency
+
+        self.calls = Counter()
+        self.units = Counter()
+        self.next_video = 0
+        self.uploads: Dict[str, List[Dict[str, Any]]] = {}
+        self.views = Counter()
+
+        published = time.time() - 7 * 24 * 60 * 60
+        for n in range(channels):
+            ycid = f"UCbench{n:017d}"
+            self.uploads[ycid] = []
+            for m in range(uploads):
+                self.add_video(ycid, published + m * 60 * 60)
+
+        self.app = web.Application()
+        self.app.router.add_get('/youtube/v3/{service}', self.handle_api)
+        self.app.router.add_get('/feeds/videos.xml', self.handle_feed)
+
+    def add_video(self, ycid: str, published: float) -> str:
+        video_id = f"v{self.next_video:010d}"
+        self.next_video += 1
+        self.uploads[ycid].insert(0, {
+            'id': video_id,
+            'title': f"Video {video_id}",
+            'description': f"Uploaded by {ycid}",
+            'published': datetime.fromtimestamp(published, timezone.utc).isoformat(timespec='seconds'),
+        })
+        return video_id
+
+    def publish(self, count: int) -> List[str]:
+        """Upload `count` new videos to random channels"""
+        now = time.time()
+        return [self.add_video(random.choice(list(self.uploads)), now) for _ in range(count)]
+
+    def reset_counts(self) -> None:
+        self.calls = Counter()
+        self.units = Counter()
+
+    async def handle_feed(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+        ycid = request.query['channel_id']
+        self.calls['feed'] += 1
+        if ycid not in self.uploads:
+            return web.Response(status=404)
+        entries = ''.join(FEED_ENTRY.format(video_id=video['id'], channel_id=ycid, title=escape(video['title']),
+                                            published=video['published'], description=escape(video['description']))
+                          for video in self.uploads[ycid][:15])
+        return web.Response(text=FEED.format(entries=entries), content_type='application/atom+xml')
+
+    async def handle_api(self, request: web.Request) -> web.Response:
+        await asyncio.sleep(self.latency)
+        service = request.match_info['service']
+        self.calls[service] += 1
+        self.units[service] += ENDPOINT_COSTS.get(service, 1)
+        params = request.query
+        if service == 'search':
+            items = [self.search_item(params['channel_id'], video)
+                     for video in self.uploads.get(params['channel_id'], [])[:int(params.get('maxResults', 5))]]
+        elif service == 'playlistItems':
+            ycid = 'UC' + params['playlistId'][2:]
+            items = [self.playlist_item(ycid, video)
+                     for video in self.uploads.get(ycid, [])[:int(params.get('maxResults', 5))]]
+        elif service == 'channels':
+            ids = params['id'].split(',') if 'id' in params else []
+            items = [self.channel_item(ycid) for ycid in ids if ycid in self.uploads]
+        elif service == 'videos':
+            items = []
+            for video_id in params['id'].split(','):
+                self.views[video_id] += 1
+                items.append({'id': video_id, 'statistics': {'viewCount': str(self.views[video_id])}})
+        else:
+            return web.json_response({'error': {'message': f"Unknown service {service}"}}, status=404)
+        # Like the real API, the response's ETag covers the whole list rather than any one item
+        etag = hashlib.md5(json.dumps(items, sort_keys=True).encode()).hexdigest()
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304)
+        return web.json_response({'etag': etag, 'pageInfo': {'totalResults': len(items)}, 'items': items})
+
+    @staticmethod
+    def snippet(ycid: str, video: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'channelId': ycid,
+            'title': video['title'],
+            'description': video['description'],
+            'publishedAt': video['published'],
+            'thumbnails': {'high': {'url': f"https://i.ytimg.com/vi/{video['id']}/hqdefault.jpg"}},
+        }
+
+    def search_item(self, ycid: str, video: Dict[str, Any]) -> Dict[str, Any]:
+        return {'id': {'videoId': video['id']}, 'snippet': self.snippet(ycid, video)}
+
+    def playlist_item(self, ycid: str, video: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'snippet': dict(self.snippet(ycid, video), videoOwnerChannelId=ycid),
+            'contentDetails': {'videoId': video['id'], 'videoPublishedAt': video['published']},
+            'status': {'privacyStatus': 'public'},
+        }
+
+    @staticmethod
+    def channel_item(ycid: str) -> Dict[str, Any]:
+        return {
+            'id': ycid,
+            'etag': f"etag-{ycid}",
+            'snippet': {'title': f"Channel {ycid[-4:]}",
+                        'thumbnails': {'default': {'url': "https://yt3.ggpht.com/default.jpg"}}},
+            'statistics': {'subscriberCount': "1000", 'hiddenSubscriberCount': False},
+            'contentDetails': {'relatedPlaylists': {'uploads': 'UU' + ycid[2:]}},
+        }
+
+
+class FakeValue:
+    """Just enough of a Red Config value for the cog's polling path."""
+
+    def __init__(self, value, writes: Counter, name: str):
+        self.value = value
+        self.writes = writes
+        self.name = name
+
+    def __call__(self):
+        return FakeValueContext(self)
+
+    async def set(self, value):
+        self.writes[self.name] += 1
+        self.value = value
+
+
+class FakeValueContext:
+    def __init__(self, value: FakeValue):
+        self._value = value
+
+    def __await__(self):
+        return self._get().__await__()
+
+    async def _get(self):
+        return copy.deepcopy(self._value.value)
+
+    async def __aenter__(self):
+        return self._value.value
+
+    async def __aexit__(self, *exc_info):
+        self._value.writes[self._value.name] += 1
+
+
+class FakeConfig:
+    def __init__(self, **values):
+        self.writes = Counter()
+        self._values = {name: FakeValue(value, self.writes, name) for name, value in values.items()}
+
+    def __getattr__(self, name):
+        return self._values[name]
+
+
+class FakeChannel:
+    """A text channel that records every message sent to it."""
+
+    def __init__(self, channel_id: int, guild_id: int, sink, latency: float = 0):
+        self.id = channel_id
+        self.guild = SimpleNamespace(id=guild_id, get_role=lambda role_id: None)
+        self.sink = sink
+        self.latency = latency
+
+    async def send(self, content=None, *, embed=None, allowed_mentions=None):
+        await asyncio.sleep(self.latency)
+        self.sink.append((time.perf_counter(), self.id, content, embed))
+
+
+class FakeBot:
+    def __init__(self, channels):
+        self.channels = {channel.id: channel for channel in channels}
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    async def get_shared_api_tokens(self, service):
+        return {'apikey': 'bench'}
+
+
+def make_stub_cog(fake: FakeYouTube, base_url: str, session: aiohttp.ClientSession, *, subscribers: int,
+                  backend: str, workers: int, send_latency: float = 0):
+    """Make a YouTubeUpdates cog that talks to the fake server instead of YouTube and Discord.
+
+    Returns the cog and the list that every fake channel appends its sends to.
+    Each YouTube channel gets `subscribers` Discord channels spread over a
+    handful of guilds, and starts out having seen every existing upload.
+    """
+    sink = []
+    fake_channels = []
+    ytchannels = {}
+    for n, ycid in enumerate(fake.uploads):
+        channels = {}
+        for m in range(subscribers):
+            channel = FakeChannel(n * subscribers + m, m % 5, sink, send_latency)
+            fake_channels.append(channel)
+            channels[str(channel.id)] = {'role': None, 'guild': channel.guild.id}
+        # Like a channel added a minute ago
+        ytchannels[ycid] = {'channels': channels, 'seen': SeenRing(time.time() - 60).dump()}
+
+    cog = YouTubeUpdates.__new__(YouTubeUpdates)
+    cog.bot = FakeBot(fake_channels)
+    cog.config = FakeConfig(ytchannels=ytchannels, backend=backend, workers=workers, wait_minutes=5,
+                            last_check=0)
+    cog.session = session
+    cog.api = YouTubeAPI(cog.bot, session, api_endpoint=base_url + '/youtube/v3/{}',
+                         feed_endpoint=base_url + '/feeds/videos.xml')
+    cog.poll_scheduler = PollScheduler()
+    cog.websub_receiver = None
+    cog.tracked = set(ytchannels)
+    cog.seen = {ycid: SeenRing.load(cdata['seen']) for ycid, cdata in ytchannels.items()}
+    cog.channel_index = ChannelIndex()
+    cog.channel_index.build(ytchannels, lambda channel_id: None)
+    cog.announce_lock = asyncio.Lock()
+    cog.send_semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+    cog.delivery_stats = DeliveryStats()
+    return cog, sink
+
+
+async def run(args):
+    fake = FakeYouTube(args.channels, args.uploads, args.api_latency)
+    runner = web.AppRunner(fake.app)
+    await runner.setup()
+    site = web.TCPSite(runner, 'localhost', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    async with aiohttp.ClientSession() as session:
+        cog, sink = make_stub_cog(fake, f"http://localhost:{port}", session, subscribers=args.subscribers,
+                                  backend=args.backend, workers=args.workers, send_latency=args.send_latency)
+        print(f"{args.channels} channels, {args.subscribers} Discord channels each, backend {args.backend},"
+              f" {args.workers} workers, {args.new} new videos per cycle")
+        print(f"{'cycle':>5} {'new':>4} {'calls':>6} {'quota':>6} {'wall ms':>9} {'sends':>6} {'writes':>7}")
+        totals = Counter()
+        for cycle in range(1, args.cycles + 1):
+            fake.reset_counts()
+            cog.config.writes.clear()
+            published = fake.publish(args.new) if cycle > 1 else []
+            # Make every channel due so each cycle polls everything
+            cog.poll_scheduler.next_poll.clear()
+            sends_before = len(sink)
+
+            start = time.perf_counter()
+            await cog.do_loop()
+            elapsed = time.perf_counter() - start
+
+            calls = sum(fake.calls.values())
+            units = sum(fake.units.values())
+            sends = len(sink) - sends_before
+            writes = sum(cog.config.writes.values())
+            totals.update(calls=calls, units=units, sends=sends, published=len(published))
+            print(f"{cycle:>5} {len(published):>4} {calls:>6} {units:>6} {elapsed * 1000:>9.1f}"
+                  f" {sends:>6} {writes:>7}")
+
+        expected = totals['published'] * args.subscribers
+        print()
+        print(f"Total: {totals['calls']} API calls, {totals['units']} quota units, {totals['sends']} sends"
+              f" ({expected} expected)")
+        print(f"Calls by endpoint: {dict(fake.calls)} (last cycle)")
+        print(f"Channel cache: {cog.api.channel_cache.hit_rate():.1%} hit rate,"
+              f" {cog.api.channel_cache.requests_saved} requests saved")
+        print(f"Deliveries: {cog.delivery_stats}")
+    await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--channels', type=int, default=50, help="Tracked YouTube channels")
+    parser.add_argument('--uploads', type=int, default=20, help="Existing uploads per channel")
+    parser.add_argument('--subscribers', type=int, default=3, help="Discord channels per YouTube channel")
+    parser.add_argument('--new', type=int, default=5, help="New videos published before each cycle")
+    parser.add_argument('--cycles', type=int, default=5)
+    parser.add_argument('--backend', choices=('feed', 'playlist', 'search'), default='playlist')
+    parser.add_argument('--workers', type=int, default=5)
+    parser.add_argument('--api-latency', type=float, default=0.02)
+    parser.add_argument('--send-latency', type=float, default=0.05)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
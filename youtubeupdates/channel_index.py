@@ -0,0 +1,52 @@
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+class ChannelIndex:
+    """A reverse index from Discord channel and guild to the YouTube channels they follow.
+
+    The index is built once from Config and then kept in sync by the add and
+    remove commands, so listing a channel's subscriptions or counting a
+    guild's is a dict lookup rather than a scan of every tracked channel.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self._channels: Dict[int, Set[str]] = {}
+        self._guilds: Dict[int, Set[Tuple[int, str]]] = {}
+        self._channel_guilds: Dict[int, int] = {}
+
+    def build(self, ytchannels: Dict[str, Dict[str, Any]], guild_of: Callable[[int], Optional[int]]) -> None:
+        """Rebuild the index.  `guild_of` finds the guild of channels stored without one."""
+        self._channels = {}
+        self._guilds = {}
+        self._channel_guilds = {}
+        for ycid, cdata in ytchannels.items():
+            for c_id, info in cdata['channels'].items():
+                self.add(ycid, int(c_id), info.get('guild') or guild_of(int(c_id)))
+        self.loaded = True
+
+    def get(self, channel_id: int) -> List[str]:
+        return sorted(self._channels.get(channel_id, ()))
+
+    def guild_count(self, guild_id: int) -> int:
+        return len(self._guilds.get(guild_id, ()))
+
+    def add(self, ycid: str, channel_id: int, guild_id: Optional[int]) -> None:
+        self._channels.setdefault(channel_id, set()).add(ycid)
+        # Channels the bot can no longer see have no guild, and don't count towards any
+        if guild_id is not None:
+            self._channel_guilds[channel_id] = guild_id
+            self._guilds.setdefault(guild_id, set()).add((channel_id, ycid))
+
+    def remove(self, ycid: str, channel_id: int) -> None:
+        channel = self._channels.get(channel_id, set())
+        channel.discard(ycid)
+        if not channel:
+            self._channels.pop(channel_id, None)
+        if (guild_id := self._channel_guilds.get(channel_id)) is not None:
+            guild = self._guilds.get(guild_id, set())
+            guild.discard((channel_id, ycid))
+            if not guild:
+                self._guilds.pop(guild_id, None)
+            if not channel:
+                self._channel_guilds.pop(channel_id, None)
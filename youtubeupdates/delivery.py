@@ -0,0 +1,41 @@
+from collections import deque
+from typing import Deque, NamedTuple, Optional
+
+
+class DeliveryTiming(NamedTuple):
+    video_id: str
+    channel_id: int
+    waited: float  # Seconds spent waiting for a send slot
+    duration: float  # Seconds the send itself took
+    ok: bool
+
+
+class DeliveryStats:
+    """Timings of the most recent sends, one per Discord channel a video went to."""
+
+    def __init__(self, history: int = 500):
+        self.sent = 0
+        self.failed = 0
+        self.timings: Deque[DeliveryTiming] = deque(maxlen=history)
+
+    def record(self, video_id: str, channel_id: int, waited: float, duration: float, ok: bool) -> None:
+        if ok:
+            self.sent += 1
+        else:
+            self.failed += 1
+        self.timings.append(DeliveryTiming(video_id, channel_id, waited, duration, ok))
+
+    def percentile(self, field: str, pct: float) -> Optional[float]:
+        values = sorted(getattr(timing, field) for timing in self.timings)
+        if not values:
+            return None
+        return values[min(int(len(values) * pct / 100), len(values) - 1)]
+
+    def __str__(self):
+        if not self.timings:
+            return f"{self.sent} sent, {self.failed} failed"
+        return (f"{self.sent} sent, {self.failed} failed\n"
+                f"Send time: p50 {self.percentile('duration', 50):.2f}s,"
+                f" p95 {self.percentile('duration', 95):.2f}s\n"
+                f"Wait for a slot: p50 {self.percentile('waited', 50):.2f}s,"
+                f" p95 {self.percentile('waited', 95):.2f}s")
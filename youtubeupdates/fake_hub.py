@@ -0,0 +1,120 @@
+"""A stand-in WebSub hub for trying out push mode locally.
+
+Run `python -m youtubeupdates.fake_hub` from the repository root, point the
+cog at it with `[p]ytupdates websub sethub http://localhost:8090/subscribe`
+and enable push mode with a callback of `http://localhost:8080/websub`.
+Subscriptions are verified against the callback like the real hub does,
+and a sample feed is pushed to every subscriber of a channel with
+
+    curl -X POST "http://localhost:8090/publish?channel_id=UC...&title=Hello"
+"""
+import argparse
+import asyncio
+import secrets
+from datetime import datetime, timezone
+from typing import Dict, NamedTuple
+from xml.sax.saxutils import escape
+
+from aiohttp import ClientSession, web
+
+from youtubeupdates.websub import sign, topic_channel, topic_url
+
+SAMPLE_FEED = """<?xml version='1.0' encoding='UTF-8'?>
+<feed xmlns:yt="http://www.youtube.com/xml/schemas/2015" xmlns="http://www.w3.org/2005/Atom">
+  <link rel="hub" href="https://pubsubhubbub.appspot.com"/>
+  <link rel="self" href="{topic}"/>
+  <title>YouTube video feed</title>
+  <updated>{published}</updated>
+  <entry>
+    <id>yt:video:{video_id}</id>
+    <yt:videoId>{video_id}</yt:videoId>
+    <yt:channelId>{channel_id}</yt:channelId>
+    <title>{title}</title>
+    <link rel="alternate" href="https://www.youtube.com/watch?v={video_id}"/>
+    <author>
+      <name>Sample Channel</name>
+      <uri>https://www.youtube.com/channel/{channel_id}</uri>
+    </author>
+    <published>{published}</published>
+    <updated>{published}</updated>
+  </entry>
+</feed>
+"""
+
+
+def sample_feed(channel_id: str, video_id: str, title: str, published: str) -> str:
+    """Make a notification body in the shape YouTube's hub sends for a new upload"""
+    return SAMPLE_FEED.format(topic=escape(topic_url(channel_id)), channel_id=channel_id, video_id=video_id,
+                              title=escape(title), published=published)
+
+
+class HubSubscription(NamedTuple):
+    callback: str
+    secret: str
+
+
+class FakeHub:
+    def __init__(self):
+        self.subscriptions: Dict[str, Dict[str, HubSubscription]] = {}
+        self.session = None
+
+        self.app = web.Application()
+        self.app.router.add_post('/subscribe', self.handle_subscribe)
+        self.app.router.add_post('/publish', self.handle_publish)
+        self.app.on_startup.append(self.open_session)
+        self.app.on_cleanup.append(self.close_session)
+
+    async def open_session(self, app):
+        self.session = ClientSession()
+
+    async def close_session(self, app):
+        await self.session.close()
+
+    async def handle_subscribe(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        if topic_channel(form.get('hub.topic', '')) is None or 'hub.callback' not in form:
+            return web.Response(status=400, text="hub.topic and hub.callback are required")
+        asyncio.create_task(self.verify(dict(form)))
+        return web.Response(status=202)
+
+    async def verify(self, form: Dict[str, str]) -> None:
+        topic, callback, mode = form['hub.topic'], form['hub.callback'], form['hub.mode']
+        challenge = secrets.token_urlsafe(16)
+        params = {'hub.mode': mode, 'hub.topic': topic, 'hub.challenge': challenge}
+        if mode == 'subscribe':
+            params['hub.lease_seconds'] = form.get('hub.lease_seconds', '432000')
+        async with self.session.get(callback, params=params) as resp:
+            confirmed = resp.status == 200 and await resp.text() == challenge
+        print(f"{mode} {topic_channel(topic)} -> {callback}: {'verified' if confirmed else 'refused'}")
+        if not confirmed:
+            return
+        if mode == 'subscribe':
+            self.subscriptions.setdefault(topic, {})[callback] = HubSubscription(callback, form.get('hub.secret', ''))
+        else:
+            self.subscriptions.get(topic, {}).pop(callback, None)
+
+    async def handle_publish(self, request: web.Request) -> web.Response:
+        channel_id = request.query['channel_id']
+        video_id = request.query.get('video_id', secrets.token_urlsafe(8)[:11])
+        title = request.query.get('title', "Sample video")
+        published = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        body = sample_feed(channel_id, video_id, title, published).encode()
+
+        results = []
+        for sub in self.subscriptions.get(topic_url(channel_id), {}).values():
+            headers = {'Content-Type': 'application/atom+xml', 'X-Hub-Signature': sign(sub.secret, body)}
+            async with self.session.post(sub.callback, data=body, headers=headers) as resp:
+                results.append(f"{sub.callback}: {resp.status}")
+        return web.Response(text='\n'.join(results) or "No subscribers")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8090)
+    args = parser.parse_args()
+    web.run_app(FakeHub().app, host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+DEFAULT_TTL = 6 * 60 * 60  # 6 hours
+
+
+class CacheEntry(NamedTuple):
+    body: Dict[str, Any]
+    etag: Optional[str]
+    fetched: float
+
+
+class MetadataCache:
+    """Cached API resources keyed by ID, along with the ETag to revalidate them with.
+
+    Entries younger than `ttl` are used as they are.  Older entries are
+    revalidated with a conditional request, and a 304 keeps the cached body.
+    """
+
+    def __init__(self, ttl: float = DEFAULT_TTL):
+        self.ttl = ttl
+
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.requests_saved = 0
+        self._entries: Dict[str, CacheEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, resource_id: str) -> Optional[CacheEntry]:
+        return self._entries.get(resource_id)
+
+    def is_fresh(self, entry: CacheEntry, now: float = None) -> bool:
+        return (time.time() if now is None else now) - entry.fetched < self.ttl
+
+    def put(self, resource_id: str, body: Dict[str, Any], etag: Optional[str]) -> None:
+        self._entries[resource_id] = CacheEntry(body, etag, time.time())
+
+    def touch(self, resource_id: str) -> None:
+        """Mark an entry as fresh again after the API said it hasn't changed"""
+        entry = self._entries[resource_id]
+        self._entries[resource_id] = entry._replace(fetched=time.time())
+
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.revalidated + self.misses
+        return (self.hits + self.revalidated) / lookups if lookups else 0
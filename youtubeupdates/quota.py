@@ -0,0 +1,145 @@
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List
+
+from dateutil import tz
+
+PACIFIC = tz.gettz('America/Los_Angeles')
+
+# Quota units per call.  Everything not listed costs 1 unit.
+ENDPOINT_COSTS = {'search': 100}
+# Quota units per channel poll with each backend, ignoring fallbacks
+POLL_COSTS = {'feed': 0, 'playlist': 1, 'search': 100}
+
+DEFAULT_BUDGET = 9000  # Leave 1000 of the default 10000 for commands
+# Searches made because a cheaper backend failed are charged here, and
+# the scheduler sets this much aside before planning regular polls
+FALLBACK = 'search_fallback'
+FALLBACK_BUDGET = 1000
+LOW_ACTIVITY_AGE = 7 * 24 * 60 * 60
+DORMANT_AGE = 30 * 24 * 60 * 60
+
+
+class QuotaTracker:
+    """Count quota units used per endpoint for the current quota day.
+
+    YouTube resets quota at midnight Pacific time, so usage is bucketed by
+    the Pacific date and starts over when it changes.
+    """
+
+    def __init__(self, budget: int = DEFAULT_BUDGET, fallback_budget: int = FALLBACK_BUDGET):
+        self.budget = budget
+        self.fallback_budget = fallback_budget
+
+        self.day = self.today()
+        self.usage = Counter()
+
+    @staticmethod
+    def today(now: float = None) -> str:
+        return datetime.fromtimestamp(time.time() if now is None else now, PACIFIC).date().isoformat()
+
+    def rollover(self, now: float = None) -> None:
+        if (day := self.today(now)) != self.day:
+            self.day = day
+            self.usage = Counter()
+
+    def record(self, endpoint: str, units: int = None) -> None:
+        self.rollover()
+        self.usage[endpoint] += ENDPOINT_COSTS.get(endpoint, 1) if units is None else units
+
+    @property
+    def used(self) -> int:
+        return sum(self.usage.values())
+
+    @property
+    def remaining(self) -> int:
+        return max(self.budget - self.used, 0)
+
+    @property
+    def fallback_remaining(self) -> int:
+        return min(max(self.fallback_budget - self.usage[FALLBACK], 0), self.remaining)
+
+    @property
+    def poll_remaining(self) -> int:
+        """What's left for regular polls once the unused fallback allowance is set aside"""
+        return self.remaining - self.fallback_remaining
+
+    def seconds_until_reset(self, now: float = None) -> float:
+        now = time.time() if now is None else now
+        tomorrow = datetime.fromtimestamp(now, PACIFIC).date() + timedelta(days=1)
+        # Compare timestamps so days where DST changes are the right length
+        return datetime.combine(tomorrow, datetime.min.time(), PACIFIC).timestamp() - now
+
+    def projected(self, now: float = None) -> float:
+        """Estimate the day's total usage by extrapolating the usage so far"""
+        elapsed = 24 * 60 * 60 - self.seconds_until_reset(now)
+        return self.used * 24 * 60 * 60 / max(elapsed, 60)
+
+    def load(self, data: Dict[str, Any]) -> None:
+        if data.get('day') == self.today():
+            self.day = data['day']
+            self.usage = Counter(data['usage'])
+
+    def dump(self) -> Dict[str, Any]:
+        return {'day': self.day, 'usage': dict(self.usage)}
+
+
+class PollScheduler:
+    """Spread channel polls across the quota day so they fit in the budget.
+
+    Every channel is polled at a shared base interval, multiplied for
+    channels that haven't uploaded in a while.  The base interval is the
+    shortest one that fits the remaining budget until the quota resets, and
+    never shorter than the cog's reload time.
+    """
+
+    def __init__(self):
+        self.next_poll: Dict[str, float] = {}
+        self.last_upload: Dict[str, float] = {}
+
+    def record_upload(self, ycid: str, published: float) -> None:
+        self.last_upload[ycid] = max(published, self.last_upload.get(ycid, 0))
+
+    def multiplier(self, ycid: str, now: float = None) -> int:
+        if ycid not in self.last_upload:
+            return 1
+        age = (time.time() if now is None else now) - self.last_upload[ycid]
+        if age > DORMANT_AGE:
+            return 6
+        if age > LOW_ACTIVITY_AGE:
+            return 2
+        return 1
+
+    def base_interval(self, ycids: Iterable[str], min_interval: float, poll_cost: int,
+                      quota: QuotaTracker, now: float = None) -> float:
+        remaining_seconds = quota.seconds_until_reset(now)
+        if poll_cost == 0:
+            return min_interval
+        if not quota.poll_remaining:
+            return remaining_seconds
+        weight = sum(1 / self.multiplier(ycid, now) for ycid in ycids)
+        return max(min_interval, remaining_seconds * weight * poll_cost / quota.poll_remaining)
+
+    def due(self, ycids: Iterable[str], now: float = None) -> List[str]:
+        now = time.time() if now is None else now
+        return [ycid for ycid in ycids if self.next_poll.get(ycid, 0) <= now]
+
+    def polled(self, ycid: str, base_interval: float, now: float = None) -> None:
+        now = time.time() if now is None else now
+        interval = base_interval * self.multiplier(ycid, now)
+        if ycid not in self.next_poll:
+            # Stagger channels after their first poll so they don't stay in lockstep
+            interval *= random.random()
+        self.next_poll[ycid] = now + interval
+
+    def planned_usage(self, ycids: Iterable[str], base_interval: float, poll_cost: int,
+                      quota: QuotaTracker, now: float = None) -> float:
+        """Estimate the day's total usage if the current schedule holds until the reset
+
+        This assumes the rest of the fallback allowance gets used.
+        """
+        remaining_seconds = quota.seconds_until_reset(now)
+        polls = sum(remaining_seconds / (base_interval * self.multiplier(ycid, now)) for ycid in ycids)
+        return quota.used + polls * poll_cost + quota.fallback_remaining
@@ -0,0 +1,51 @@
+from collections import deque
+from typing import Any, Dict, Iterable
+
+RING_SIZE = 64
+LATE_WINDOW = 2 * 24 * 60 * 60  # How late a video can show up after newer ones and still be announced
+
+
+class SeenRing:
+    """The IDs of a channel's most recently seen videos, plus a watermark.
+
+    The ring holds a fixed number of IDs with a set alongside for O(1)
+    lookups.  Videos published before the watermark count as seen even
+    once their IDs have left the ring.  The watermark trails the newest
+    publish time seen by `LATE_WINDOW`, so videos that are indexed late are
+    still announced as long as the ring is big enough to cover that window.
+    """
+
+    def __init__(self, watermark: float = 0, ids: Iterable[str] = (), size: int = RING_SIZE):
+        self.watermark = watermark
+
+        self._ring = deque(maxlen=size)
+        self._ids = set()
+        for video_id in ids:
+            self.add(video_id)
+
+    def __contains__(self, video_id: str) -> bool:
+        return video_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    def is_new(self, video_id: str, published: float) -> bool:
+        return published > self.watermark and video_id not in self._ids
+
+    def add(self, video_id: str, published: float = None) -> None:
+        if published is not None:
+            self.watermark = max(self.watermark, published - LATE_WINDOW)
+        if video_id in self._ids:
+            return
+        if len(self._ring) == self._ring.maxlen:
+            self._ids.discard(self._ring[0])
+        self._ring.append(video_id)
+        self._ids.add(video_id)
+
+    @classmethod
+    def load(cls, data: Dict[str, Any]) -> "SeenRing":
+        return cls(data['watermark'], data['ids'].split())
+
+    def dump(self) -> Dict[str, Any]:
+        # Video IDs never contain spaces, so one string is the most compact way to store them
+        return {'ids': ' '.join(self._ring), 'watermark': int(self.watermark)}
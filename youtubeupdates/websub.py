@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import hmac
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from urllib.parse import parse_qs, urlparse
+
+from aiohttp import ClientSession, web
+
+from youtubeupdates.yt_api import parse_feed
+
+logger = logging.getLogger('red.aradiacogs.youtubeupdates')
+
+DEFAULT_HUB = "https://pubsubhubbub.appspot.com/subscribe"
+TOPIC_URL = "https://www.youtube.com/xml/feeds/videos.xml?channel_id={}"
+LEASE_SECONDS = 5 * 24 * 60 * 60  # 5 days
+RENEW_BEFORE = 12 * 60 * 60  # Renew leases half a day before they expire
+
+
+def topic_url(ycid: str) -> str:
+    return TOPIC_URL.format(ycid)
+
+
+def topic_channel(topic: str) -> Optional[str]:
+    """Get the channel ID out of a YouTube feed topic URL"""
+    return parse_qs(urlparse(topic).query).get('channel_id', [None])[0]
+
+
+def sign(secret: str, body: bytes) -> str:
+    return 'sha1=' + hmac.new(secret.encode(), body, hashlib.sha1).hexdigest()
+
+
+class WebSubReceiver:
+    """Receive YouTube upload notifications pushed by a WebSub hub.
+
+    The hub verifies each subscription with a GET to the callback, which is
+    answered only for tracked channels, and then POSTs the channel's Atom
+    feed whenever a video is published or updated.  Notifications are
+    checked against the subscription secret before being handed to
+    `on_videos`.
+    """
+
+    def __init__(self, on_videos: Callable[[List[Dict[str, Any]]], Awaitable[None]],
+                 is_tracked: Callable[[str], bool], secret: str, path: str = '/websub'):
+        self.on_videos = on_videos
+        self.is_tracked = is_tracked
+        self.secret = secret
+        self.path = path
+
+        self.leases: Dict[str, float] = {}
+        self.verified: Set[str] = set()
+        self.notifications = 0
+        self.rejected = 0
+        self._tasks = set()
+        self._runner: Optional[web.AppRunner] = None
+
+        self.app = web.Application()
+        self.app.router.add_get(path, self.handle_verify)
+        self.app.router.add_post(path, self.handle_notification)
+
+    async def start(self, host: str, port: int) -> None:
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        logger.info("WebSub receiver listening on %s:%s%s", host, port, self.path)
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+        self._runner = None
+
+    async def handle_verify(self, request: web.Request) -> web.Response:
+        mode = request.query.get('hub.mode')
+        ycid = topic_channel(request.query.get('hub.topic', ''))
+        challenge = request.query.get('hub.challenge')
+        if ycid is None or challenge is None:
+            return web.Response(status=400)
+
+        if mode == 'subscribe' and self.is_tracked(ycid):
+            lease = int(request.query.get('hub.lease_seconds', LEASE_SECONDS))
+            self.leases[ycid] = time.time() + lease
+            self.verified.add(ycid)
+        elif mode == 'unsubscribe' and not self.is_tracked(ycid):
+            self.leases.pop(ycid, None)
+            self.verified.discard(ycid)
+        else:
+            return web.Response(status=404)
+        return web.Response(text=challenge)
+
+    async def handle_notification(self, request: web.Request) -> web.Response:
+        body = await request.read()
+        # Hubs expect a 2xx even for bad signatures, so the notification is just dropped
+        if not hmac.compare_digest(request.headers.get('X-Hub-Signature', ''), sign(self.secret, body)):
+            self.rejected += 1
+            logger.warning("Dropped a WebSub notification with a bad signature.")
+            return web.Response(status=204)
+
+        try:
+            videos = parse_feed(body.decode())
+        except Exception:
+            logger.exception("Unable to parse WebSub notification.")
+            return web.Response(status=204)
+        self.notifications += 1
+        if videos:
+            # Answer the hub right away and announce in the background
+            task = asyncio.create_task(self.on_videos(videos))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return web.Response(status=204)
+
+    def needs_renewal(self, ycid: str, now: float = None) -> bool:
+        return self.leases.get(ycid, 0) - RENEW_BEFORE < (time.time() if now is None else now)
+
+    async def subscribe(self, session: ClientSession, hub_url: str, callback_url: str, ycid: str,
+                        mode: str = 'subscribe') -> None:
+        """Ask the hub to (un)subscribe.  The hub confirms later with a GET to the callback."""
+        data = {
+            'hub.callback': callback_url,
+            'hub.topic': topic_url(ycid),
+            'hub.mode': mode,
+            'hub.verify': 'async',
+        }
+        if mode == 'subscribe':
+            data['hub.secret'] = self.secret
+            data['hub.lease_seconds'] = str(LEASE_SECONDS)
+            # Don't ask again for an hour, which gives the hub time to verify
+            self.leases[ycid] = max(self.leases.get(ycid, 0), time.time() + RENEW_BEFORE + 60 * 60)
+        async with session.post(hub_url, data=data) as resp:
+            if resp.status >= 300:
+                self.leases.pop(ycid, None)
+                raise IOError(f"Hub refused to {mode} to {ycid}: {resp.status} {await resp.text()}")
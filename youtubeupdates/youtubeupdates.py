@@ -2,9 +2,11 @@ import asyncio
 import html
 import logging
 import re
-from datetime import datetime, timezone
+import secrets
+import time
+from datetime import datetime
 from io import BytesIO
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 
 import aiohttp
 import discord
@@ -18,9 +20,19 @@ from redbot.core.bot import Red
 from redbot.core.utils.chat_formatting import box, pagify
 from tsutils.user_interaction import get_user_confirmation
 
+from youtubeupdates.channel_index import ChannelIndex
+from youtubeupdates.delivery import DeliveryStats
+from youtubeupdates.quota import DEFAULT_BUDGET, POLL_COSTS, PollScheduler
+from youtubeupdates.seen_ring import SeenRing
+from youtubeupdates.websub import DEFAULT_HUB, WebSubReceiver
+from youtubeupdates.yt_api import BACKENDS, YouTubeAPI, published_at
+
 logger = logging.getLogger('red.aradiacogs.youtubeupdates')
 
 CHANNEL_URL_REGEX = re.compile(r"^(?:https?://)?(?:www\.)?youtube\.com/(?:channel)/([\w-]+)")
+# With push mode on, polling only has to catch what the hub missed
+RECONCILE_INTERVAL = 60 * 60
+SEND_CONCURRENCY = 10
 
 
 class YouTubeUpdates(commands.Cog):
@@ -29,10 +41,21 @@ class YouTubeUpdates(commands.Cog):
         self.bot = bot
 
         self.config = Config.get_conf(self, identifier=70777837904735)
-        self.config.register_global(last_check=0, ytchannels={}, wait_minutes=5)
-        self.config.register_guild(channel_count=0)
+        self.config.register_global(last_check=0, ytchannels={}, wait_minutes=5, backend='playlist', workers=5,
+                                    quota={}, daily_budget=DEFAULT_BUDGET,
+                                    websub={'enabled': False, 'callback_url': None, 'host': '0.0.0.0',
+                                            'port': 8080, 'hub_url': DEFAULT_HUB, 'secret': None})
 
         self.session = aiohttp.ClientSession()
+        self.api = YouTubeAPI(bot, self.session)
+        self.poll_scheduler = PollScheduler()
+        self.websub_receiver: Optional[WebSubReceiver] = None
+        self.tracked: Set[str] = set()
+        self.seen: Dict[str, SeenRing] = {}
+        self.channel_index = ChannelIndex()
+        self.send_semaphore = asyncio.Semaphore(SEND_CONCURRENCY)
+        self.delivery_stats = DeliveryStats()
+        self.announce_lock = asyncio.Lock()
 
         self._loop = bot.loop.create_task(self.run_loop())
 
@@ -50,56 +73,214 @@ class YouTubeUpdates(commands.Cog):
 
     def cog_unload(self):
         self._loop.cancel()
-        self.bot.loop.create_task(self.session.close())
+        self.bot.loop.create_task(self.close())
+
+    async def close(self):
+        if self.websub_receiver is not None:
+            await self.websub_receiver.stop()
+        await self.session.close()
 
     async def run_loop(self):
         await self.bot.wait_until_red_ready()
+        self.api.quota.budget = await self.config.daily_budget()
+        self.api.quota.load(await self.config.quota())
+        await self.load_seen()
+        await self.ensure_index()
+        if (await self.config.websub())['enabled']:
+            try:
+                await self.start_websub()
+            except Exception:
+                logger.exception("Unable to start the WebSub receiver.")
         while True:
             try:
                 await self.do_loop()
+                await self.renew_websub()
             except asyncio.CancelledError:
                 break
             except Exception:
                 logger.exception("Error in loop")
+            await self.config.quota.set(self.api.quota.dump())
             await asyncio.sleep(60 * await self.config.wait_minutes())
 
-    async def do_loop(self):
-        last_check = datetime.fromtimestamp(await self.config.last_check() - 60 * 60, timezone.utc)
+    async def load_seen(self):
+        last_check = await self.config.last_check()
+        async with self.config.ytchannels() as ytchannels:
+            for ycid, cdata in ytchannels.items():
+                if 'seen' not in cdata:
+                    # Older versions kept the last 15 IDs and announced anything published
+                    # after an hour before the last check
+                    cdata['seen'] = SeenRing(last_check - 60 * 60, cdata.pop('seen_ids', [])).dump()
+                self.seen[ycid] = SeenRing.load(cdata['seen'])
+            self.tracked = set(ytchannels)
+
+    async def ensure_index(self):
+        if not self.channel_index.loaded:
+            self.channel_index.build(await self.config.ytchannels(), self.guild_of)
+
+    def guild_of(self, channel_id: int) -> Optional[int]:
+        channel = self.bot.get_channel(channel_id)
+        return channel.guild.id if channel is not None and getattr(channel, 'guild', None) else None
 
-        async with self.config.ytchannels() as full_channels:
-            for ycid, cdata in full_channels.items():
+    async def do_loop(self):
+        started = datetime.now().timestamp()
+        backend = await self.config.backend()
+        semaphore = asyncio.Semaphore(await self.config.workers())
+
+        # Read state once so add/remove aren't blocked while channels are polled
+        ytchannels = await self.config.ytchannels()
+        self.tracked = set(ytchannels)
+
+        # Only poll the channels whose turn has come up under the quota budget
+        self.api.quota.rollover()
+        base_interval = self.poll_scheduler.base_interval(ytchannels, await self.min_poll_interval(),
+                                                          POLL_COSTS[backend], self.api.quota)
+        due = self.poll_scheduler.due(ytchannels)
+
+        async def poll(ycid):
+            async with semaphore:
+                result = await self.poll_channel(ycid, backend)
+            self.poll_scheduler.polled(ycid, base_interval, started)
+            return result
+
+        results = await asyncio.gather(*(poll(ycid) for ycid in due))
+
+        # Collect every new video first so their metadata can be looked up in batches
+        new_videos = []
+        recent = {}
+        for ycid, (videos, all_videos) in zip(due, results):
+            if videos:
+                recent[ycid] = all_videos
+                new_videos.extend((ycid, video) for video in videos)
+
+        if new_videos:
+            await self.announce_videos(new_videos, recent)
+
+    async def announce_videos(self, videos: List[Tuple[str, Dict[str, Any]]],
+                              recent: Dict[str, List[Dict[str, Any]]] = None):
+        """Announce videos that haven't been seen yet, from either polling or push
+
+        Videos are marked seen under a lock before sending, so a video that's
+        both pushed and polled is only announced once.  The other `recent`
+        uploads of each channel are marked seen along with them.
+        """
+        recent = recent or {}
+        async with self.announce_lock:
+            ytchannels = await self.config.ytchannels()
+            new_videos = []
+            new_ids = set()
+            for ycid, video in videos:
+                video_id = video['id']['videoId']
+                if ycid in ytchannels and ycid in self.seen and video_id not in new_ids \
+                        and self.seen[ycid].is_new(video_id, published_at(video)):
+                    new_ids.add(video_id)
+                    new_videos.append((ycid, ytchannels[ycid]['channels'], video))
+            if not new_videos:
+                return
+            channels_data = await self.api.get_channels(ycid for ycid, _, _ in new_videos)
+            videos_data = await self.api.get_videos(video['id']['videoId'] for _, _, video in new_videos)
+
+            for ycid, _, video in new_videos:
+                for seen_video in recent.get(ycid, []) + [video]:
+                    self.seen[ycid].add(seen_video['id']['videoId'], published_at(seen_video))
+            async with self.config.ytchannels() as full_channels:
+                for ycid in {ycid for ycid, _, _ in new_videos}:
+                    if ycid in full_channels:
+                        full_channels[ycid]['seen'] = self.seen[ycid].dump()
+
+        for ycid, discord_channels, video in new_videos:
+            channel_data = channels_data.get(ycid)
+            video_data = videos_data.get(video['id']['videoId'])
+            if channel_data is None or video_data is None:
+                continue
+            # Videos go out one at a time so channels get them in upload order
+            await self.send_video(video['id']['videoId'], discord_channels,
+                                  self.make_embed(video, channel_data, video_data))
+
+    async def send_video(self, video_id: str, discord_channels: Dict[str, Dict[str, Any]], embed: Embed):
+        """Send one rendered video to every subscribed channel at once, up to SEND_CONCURRENCY at a time"""
+        async def deliver(channel, info):
+            queued = time.monotonic()
+            async with self.send_semaphore:
+                started = time.monotonic()
+                ok = False
                 try:
-                    data = await self.do_api_call('search', {'part': 'snippet', 'channel_id': ycid, 'maxResults': 15,
-                                                             'order': 'date', 'type': 'video'})
-                    all_videos = data['items'][::-1]
-                    videos = [v for v in all_videos
-                              if isoparse(v['snippet']['publishedAt']) > last_check
-                              and v['id']['videoId'] not in cdata.get('seen_ids', [])]
-                    if not videos:
-                        continue
-                    full_channels[ycid]['seen_ids'] = [v['id']['videoId'] for v in all_videos]
-
-                    data = await self.do_api_call('channels', {'part': 'snippet,statistics', 'id': ycid})
-                    channel_data = data['items'][0]
-
-                    for video in videos:
-                        data = await self.do_api_call('videos', {'part': 'statistics', 'id': video['id']['videoId']})
-                        video_data = data['items'][0]
-                        for c_id, info in cdata['channels'].items():
-                            if not (channel := self.bot.get_channel(int(c_id))):
-                                continue
-                            video_embed = self.make_embed(video, channel_data, video_data)
-                            try:
-                                if (role := channel.guild.get_role(info.get('role'))) is not None:
-                                    await channel.send(role.mention, embed=video_embed,
-                                                       allowed_mentions=discord.AllowedMentions(roles=True))
-                                else:
-                                    await channel.send(embed=video_embed)
-                            except discord.Forbidden:
-                                pass
-                except Exception:
-                    logger.exception("Error in loop.")
-        await self.config.last_check.set(datetime.now().timestamp())
+                    if (role := channel.guild.get_role(info.get('role'))) is not None:
+                        await channel.send(role.mention, embed=embed,
+                                           allowed_mentions=discord.AllowedMentions(roles=True))
+                    else:
+                        await channel.send(embed=embed)
+                    ok = True
+                except discord.Forbidden:
+                    pass
+                except discord.HTTPException:
+                    logger.exception("Unable to send %s to %s.", video_id, channel.id)
+                self.delivery_stats.record(video_id, channel.id, started - queued, time.monotonic() - started, ok)
+
+        await asyncio.gather(*(deliver(channel, info) for c_id, info in discord_channels.items()
+                               if (channel := self.bot.get_channel(int(c_id)))))
+
+    async def on_pushed_videos(self, videos: List[Dict[str, Any]]):
+        # The hub also pushes edits to old videos, which the seen watermark filters out
+        videos = [(video['snippet']['channelId'], video) for video in videos]
+        try:
+            await self.announce_videos(videos)
+        except Exception:
+            logger.exception("Error announcing pushed videos")
+
+    async def min_poll_interval(self) -> float:
+        min_interval = 60 * await self.config.wait_minutes()
+        if self.websub_receiver is not None:
+            return max(min_interval, RECONCILE_INTERVAL)
+        return min_interval
+
+    async def start_websub(self):
+        """Start the push receiver and subscribe to every tracked channel"""
+        settings = await self.config.websub()
+        self.websub_receiver = WebSubReceiver(self.on_pushed_videos, lambda ycid: ycid in self.tracked,
+                                              settings['secret'])
+        try:
+            await self.websub_receiver.start(settings['host'], settings['port'])
+        except Exception:
+            self.websub_receiver = None
+            raise
+        await self.renew_websub()
+
+    async def stop_websub(self):
+        """Stop the push receiver.  Its subscriptions lapse when their leases run out."""
+        if self.websub_receiver is None:
+            return
+        await self.websub_receiver.stop()
+        self.websub_receiver = None
+
+    async def renew_websub(self):
+        if self.websub_receiver is None:
+            return
+        for ycid in list(self.tracked):
+            if self.websub_receiver.needs_renewal(ycid):
+                await self.websub_subscribe(ycid)
+
+    async def websub_subscribe(self, ycid: str, mode: str = 'subscribe'):
+        if self.websub_receiver is None:
+            return
+        settings = await self.config.websub()
+        try:
+            await self.websub_receiver.subscribe(self.session, settings['hub_url'], settings['callback_url'], ycid, mode)
+        except Exception:
+            logger.exception("Unable to %s to %s.", mode, ycid)
+
+    async def poll_channel(self, ycid, backend) -> Tuple[List[dict], List[dict]]:
+        """Get a channel's new videos, oldest first, along with every recent upload"""
+        try:
+            all_videos = (await self.api.get_uploads(ycid, backend))[::-1]
+        except Exception:
+            logger.exception("Error polling %s.", ycid)
+            return [], []
+        if all_videos:
+            self.poll_scheduler.record_upload(ycid, published_at(all_videos[-1]))
+        if (seen := self.seen.get(ycid)) is None:
+            return [], []
+        videos = [v for v in all_videos if seen.is_new(v['id']['videoId'], published_at(v))]
+        return videos, all_videos
 
     @commands.group(aliases=['youtubeupdates', 'ytupdate', 'ytupdates', 'Tube', 'tube'])
     async def youtubeupdate(self, ctx):
@@ -110,7 +291,8 @@ class YouTubeUpdates(commands.Cog):
     async def ytuc_add(self, ctx, role: Optional[discord.Role], *, channel):
         """Add a channel"""
         role = role.id if role is not None else None
-        if await self.config.guild(ctx.guild).channel_count() >= 5 \
+        await self.ensure_index()
+        if self.channel_index.guild_count(ctx.guild.id) >= 5 \
                 and ctx.author.id not in self.bot.owner_ids:
             await ctx.send("You can't have more than five channels"
                            " set up with this guild.")
@@ -123,10 +305,15 @@ class YouTubeUpdates(commands.Cog):
             return
         async with self.config.ytchannels() as ytchannels:
             if ytc_id not in ytchannels:
-                ytchannels[ytc_id] = {'channels': {}}
+                # Only announce videos published from now on
+                self.seen[ytc_id] = SeenRing(datetime.now().timestamp())
+                ytchannels[ytc_id] = {'channels': {}, 'seen': self.seen[ytc_id].dump()}
             if str(ctx.channel.id) not in ytchannels[ytc_id]['channels']:
-                ytchannels[ytc_id]['channels'][str(ctx.channel.id)] = {'role': role}
-        await self.config.guild(ctx.guild).channel_count.set(await self.config.guild(ctx.guild).channel_count() + 1)
+                ytchannels[ytc_id]['channels'][str(ctx.channel.id)] = {'role': role, 'guild': ctx.guild.id}
+                self.channel_index.add(ytc_id, ctx.channel.id, ctx.guild.id)
+        if ytc_id not in self.tracked:
+            self.tracked.add(ytc_id)
+            await self.websub_subscribe(ytc_id)
         await ctx.tick()
 
     @youtubeupdate.command(name="remove", aliases=['rm', 'delete', 'del'])
@@ -136,16 +323,20 @@ class YouTubeUpdates(commands.Cog):
         ytc_id = await self.ask_channel(ctx, channel)
         if ytc_id is None:
             return
+        await self.ensure_index()
+        if ytc_id not in self.channel_index.get(ctx.channel.id):
+            await ctx.send("This channel is not configured to recieve updates"
+                           " from that youtube channel.")
+            return
         async with self.config.ytchannels() as ytchannels:
-            if ytc_id not in ytchannels or \
-                    str(ctx.channel.id) not in ytchannels[ytc_id]['channels']:
-                await ctx.send("This channel is not configured to recieve updates"
-                               " from that youtube channel.")
-                return
-            del ytchannels[ytc_id]['channels'][str(ctx.channel.id)]
+            self.channel_index.remove(ytc_id, ctx.channel.id)
+            ytchannels[ytc_id]['channels'].pop(str(ctx.channel.id), None)
             if not ytchannels[ytc_id]['channels']:
                 del ytchannels[ytc_id]
-        await self.config.guild(ctx.guild).channel_count.set(await self.config.guild(ctx.guild).channel_count() - 1)
+                self.tracked.discard(ytc_id)
+                self.seen.pop(ytc_id, None)
+        if ytc_id not in self.tracked:
+            await self.websub_subscribe(ytc_id, 'unsubscribe')
         await ctx.tick()
 
     @youtubeupdate.command(name="listall")
@@ -162,9 +353,8 @@ class YouTubeUpdates(commands.Cog):
     @youtubeupdate.command(name="list")
     async def ytuc_list(self, ctx):
         """List the channels set in this channel"""
-        ytchannels = [self.id_to_link(ytcid)
-                      for ytcid, cdata in (await self.config.ytchannels()).items()
-                      if str(ctx.channel.id) in cdata['channels']]
+        await self.ensure_index()
+        ytchannels = [self.id_to_link(ytcid) for ytcid in self.channel_index.get(ctx.channel.id)]
         if not ytchannels:
             await ctx.send("There are no YouTube channels set up in this Discord channel.")
         for page in pagify('\n'.join(ytchannels)):
@@ -180,6 +370,138 @@ class YouTubeUpdates(commands.Cog):
         await self.config.wait_minutes.set(reload_time)
         await ctx.tick()
 
+    @youtubeupdate.command()
+    @checks.is_owner()
+    async def quota(self, ctx):
+        """Show today's quota usage and where it's headed"""
+        quota = self.api.quota
+        quota.rollover()
+        ytchannels = await self.config.ytchannels()
+        backend = await self.config.backend()
+        base_interval = self.poll_scheduler.base_interval(ytchannels, await self.min_poll_interval(),
+                                                          POLL_COSTS[backend], quota)
+        planned = self.poll_scheduler.planned_usage(ytchannels, base_interval, POLL_COSTS[backend], quota)
+        lines = [f"Quota day: {quota.day} (resets in {quota.seconds_until_reset() / 3600:.1f} hours)",
+                 f"Used: {quota.used} / {quota.budget}"]
+        lines.extend(f"  {endpoint}: {units}" for endpoint, units in quota.usage.most_common())
+        lines.append(f"Set aside for search fallbacks: {quota.fallback_remaining}")
+        lines.append(f"Projected at the current rate: {quota.projected():.0f}")
+        lines.append(f"Planned by the scheduler: {planned:.0f}")
+        lines.append(f"Base poll interval: {base_interval / 60:.1f} minutes")
+        await ctx.send(box('\n'.join(lines)))
+
+    @youtubeupdate.command()
+    @checks.is_owner()
+    async def setbudget(self, ctx, units: int):
+        """Sets how many quota units this cog may use per day"""
+        if units < 1:
+            await ctx.send("units must be at least 1.")
+            return
+        await self.config.daily_budget.set(units)
+        self.api.quota.budget = units
+        await ctx.tick()
+
+    @youtubeupdate.command()
+    @checks.is_owner()
+    async def cachestats(self, ctx):
+        """Show how well the channel metadata cache is working"""
+        cache = self.api.channel_cache
+        await ctx.send(box(f"Cached channels: {len(cache)}\n"
+                           f"Fresh hits: {cache.hits}\n"
+                           f"Revalidated (304): {cache.revalidated}\n"
+                           f"Misses: {cache.misses}\n"
+                           f"Hit rate: {cache.hit_rate():.1%}\n"
+                           f"Requests saved: {cache.requests_saved}"))
+
+    @youtubeupdate.command()
+    @checks.is_owner()
+    async def deliverystats(self, ctx):
+        """Show how long sending new videos to Discord takes"""
+        await ctx.send(box(str(self.delivery_stats)))
+
+    @youtubeupdate.command()
+    @checks.is_owner()
+    async def setworkers(self, ctx, workers: int):
+        """Sets how many YouTube channels are checked at the same time"""
+        if workers < 1:
+            await ctx.send("workers must be at least 1.")
+            return
+        await self.config.workers.set(workers)
+        await ctx.tick()
+
+    @youtubeupdate.command()
+    @checks.is_owner()
+    async def setbackend(self, ctx, backend: str):
+        """Sets how this cog checks for new videos
+
+        `feed` uses the public RSS feed and costs no quota.
+        `playlist` reads each channel's uploads playlist for 1 quota unit.
+        `search` uses the search endpoint for 100 quota units.
+        Cheaper backends fall back to more expensive ones if they fail.
+        """
+        backend = backend.lower()
+        if backend not in BACKENDS:
+            await ctx.send(f"backend must be one of {', '.join(BACKENDS)}.")
+            return
+        await self.config.backend.set(backend)
+        await ctx.tick()
+
+    @youtubeupdate.group()
+    @checks.is_owner()
+    async def websub(self, ctx):
+        """Have new videos pushed by a WebSub hub instead of waiting for polls"""
+
+    @websub.command(name="enable")
+    async def websub_enable(self, ctx, callback_url: str, port: int = 8080, host: str = '0.0.0.0'):
+        """Start receiving pushed videos
+
+        `callback_url` is the public URL the hub can reach the receiver at.
+        The receiver listens on `host`:`port` at the path /websub.  Channels
+        are still polled hourly to catch anything the hub misses.
+        """
+        async with self.config.websub() as settings:
+            settings.update(enabled=True, callback_url=callback_url, host=host, port=port)
+            if settings['secret'] is None:
+                settings['secret'] = secrets.token_hex(16)
+        if self.websub_receiver is not None:
+            await self.stop_websub()
+        try:
+            await self.start_websub()
+        except OSError as e:
+            await ctx.send(f"Unable to start the receiver: {e}")
+            return
+        await ctx.tick()
+
+    @websub.command(name="disable")
+    async def websub_disable(self, ctx):
+        """Stop receiving pushed videos and go back to polling"""
+        async with self.config.websub() as settings:
+            settings['enabled'] = False
+        await self.stop_websub()
+        await ctx.tick()
+
+    @websub.command(name="sethub")
+    async def websub_sethub(self, ctx, hub_url: str = DEFAULT_HUB):
+        """Sets the hub to subscribe with.  Leave empty for YouTube's hub."""
+        async with self.config.websub() as settings:
+            settings['hub_url'] = hub_url
+        await ctx.tick()
+
+    @websub.command(name="status")
+    async def websub_status(self, ctx):
+        """Show the state of the push receiver"""
+        settings = await self.config.websub()
+        if self.websub_receiver is None:
+            await ctx.send(box(f"Push mode is {'enabled but not running' if settings['enabled'] else 'disabled'}."))
+            return
+        await ctx.send(box(f"Listening on {settings['host']}:{settings['port']}{self.websub_receiver.path}\n"
+                           f"Callback: {settings['callback_url']}\n"
+                           f"Hub: {settings['hub_url']}\n"
+                           f"Subscribed: {len(self.websub_receiver.verified & self.tracked)}"
+                           f" / {len(self.tracked)} channels\n"
+                           f"Notifications: {self.websub_receiver.notifications}"
+                           f" ({self.websub_receiver.rejected} rejected)"))
+
     async def ensure_api(self) -> bool:
         keys = await self.bot.get_shared_api_tokens("youtube")
         return "apikey" in keys
@@ -212,16 +534,7 @@ class YouTubeUpdates(commands.Cog):
         return None, False
 
     async def do_api_call(self, service, params):
-        endpoint = "https://youtube.googleapis.com/youtube/v3/{}"
-        headers = {'Accept': 'application/json'}
-        params.update({'key': (await self.bot.get_shared_api_tokens("youtube"))['apikey']})
-
-        async with self.session.get(endpoint.format(service), params=params, headers=headers) as resp:
-            data = await resp.json()
-
-        if 'error' in data:
-            raise IOError(data['error']['message'])
-        return data
+        return await self.api.do_api_call(service, params)
 
     def id_to_link(self, ytid):
         return 'https://www.youtube.com/channel/' + ytid
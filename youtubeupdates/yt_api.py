@@ -0,0 +1,251 @@
+import asyncio
+import logging
+import math
+import xml.etree.ElementTree as ET
+from typing import Any, Dict, List, Optional
+
+from aiohttp import ClientError, ClientSession
+from dateutil.parser import isoparse
+from redbot.core.bot import Red
+
+from youtubeupdates.metadata_cache import MetadataCache
+from youtubeupdates.quota import ENDPOINT_COSTS, FALLBACK, QuotaTracker
+
+logger = logging.getLogger('red.aradiacogs.youtubeupdates')
+
+API_ENDPOINT = "https://youtube.googleapis.com/youtube/v3/{}"
+FEED_ENDPOINT = "https://www.youtube.com/feeds/videos.xml"
+MAX_IDS_PER_REQUEST = 50
+FEED_NAMESPACES = {
+    'atom': "http://www.w3.org/2005/Atom",
+    'yt': "http://www.youtube.com/xml/schemas/2015",
+    'media': "http://search.yahoo.com/mrss/",
+}
+
+# Each backend falls back to the next, more expensive one when it fails.
+# Falling back to search is limited, see YouTubeAPI.get_uploads.
+BACKENDS = {
+    'feed': ('feed', 'playlist', 'search'),
+    'playlist': ('playlist', 'search'),
+    'search': ('search',),
+}
+
+
+def make_video(video_id: str, title: str, description: str, published_at: str,
+               thumbnail: Optional[str] = None, channel_id: Optional[str] = None) -> Dict[str, Any]:
+    """Make a video in the same shape as a `search` result so every backend renders the same way."""
+    return {
+        'id': {'videoId': video_id},
+        'snippet': {
+            'channelId': channel_id,
+            'title': title,
+            'description': description,
+            'publishedAt': published_at,
+            'thumbnails': {'high': {'url': thumbnail or f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg"}},
+        },
+    }
+
+
+def published_at(video: Dict[str, Any]) -> float:
+    return isoparse(video['snippet']['publishedAt']).timestamp()
+
+
+def parse_feed(text: str) -> List[Dict[str, Any]]:
+    """Parse the entries of a YouTube Atom feed into search-shaped videos, newest first."""
+    root = ET.fromstring(text)
+    videos = []
+    for entry in root.findall('atom:entry', FEED_NAMESPACES):
+        thumbnail = entry.find('media:group/media:thumbnail', FEED_NAMESPACES)
+        videos.append(make_video(
+            entry.findtext('yt:videoId', namespaces=FEED_NAMESPACES),
+            entry.findtext('atom:title', '', FEED_NAMESPACES),
+            entry.findtext('media:group/media:description', '', FEED_NAMESPACES),
+            entry.findtext('atom:published', namespaces=FEED_NAMESPACES),
+            thumbnail.get('url') if thumbnail is not None else None,
+            entry.findtext('yt:channelId', namespaces=FEED_NAMESPACES),
+        ))
+    return videos
+
+
+class YouTubeAPIError(IOError):
+    def __init__(self, message: str, status: int, reason: Optional[str] = None):
+        super().__init__(message)
+        self.status = status
+        self.reason = reason
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether an error might go away on its own, as opposed to e.g. a missing playlist or no quota"""
+    if isinstance(error, YouTubeAPIError):
+        return error.status >= 500
+    return isinstance(error, (ClientError, asyncio.TimeoutError))
+
+
+class YouTubeAPI:
+    def __init__(self, bot: Red, session: ClientSession, api_endpoint: str = API_ENDPOINT,
+                 feed_endpoint: str = FEED_ENDPOINT):
+        self.bot = bot
+
+        self.session = session
+        self.api_endpoint = api_endpoint
+        self.feed_endpoint = feed_endpoint
+
+        self.uploads_ids: Dict[str, str] = {}
+        # The quota day each channel last fell back to search on
+        self.search_fallbacks: Dict[str, str] = {}
+        self.channel_cache = MetadataCache()
+        self.quota = QuotaTracker()
+
+    async def do_api_call(self, service: str, params: Dict[str, Any], etag: Optional[str] = None,
+                          quota_key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Make a single call to the YouTube Data API
+
+        If `etag` is given the request is conditional, and None is returned when
+        the resource hasn't changed.  The call's quota is charged to
+        `quota_key`, which defaults to the service.
+        """
+        headers = {'Accept': 'application/json'}
+        if etag is not None:
+            headers['If-None-Match'] = etag
+        params.update({'key': (await self.bot.get_shared_api_tokens("youtube"))['apikey']})
+
+        self.quota.record(quota_key or service, ENDPOINT_COSTS.get(service, 1))
+        async with self.session.get(self.api_endpoint.format(service), params=params, headers=headers) as resp:
+            if resp.status == 304:
+                return None
+            data = await resp.json()
+
+        if 'error' in data:
+            error = data['error']
+            reason = (error.get('errors') or [{}])[0].get('reason')
+            raise YouTubeAPIError(error['message'], error.get('code', resp.status), reason)
+        return data
+
+    async def get_batched(self, service: str, part: str, ids) -> Dict[str, Dict[str, Any]]:
+        """Look up resources by ID, 50 IDs per request, and return them keyed by ID"""
+        ids = list(dict.fromkeys(ids))
+        resources = {}
+        for start in range(0, len(ids), MAX_IDS_PER_REQUEST):
+            data = await self.do_api_call(service, {'part': part,
+                                                    'id': ','.join(ids[start:start + MAX_IDS_PER_REQUEST])})
+            resources.update({item['id']: item for item in data['items']})
+        return resources
+
+    async def get_channels(self, ycids) -> Dict[str, Dict[str, Any]]:
+        """Get channel snippets and statistics, using the metadata cache where possible
+
+        Fresh entries are used without a request.  Everything else is fetched
+        in batches of 50.  A response's ETag covers the whole list it returned,
+        so it's only kept when a single channel was requested, and only a lone
+        stale channel is revalidated with one.
+        """
+        ycids = list(dict.fromkeys(ycids))
+        channels = {}
+        to_fetch = []
+        for ycid in ycids:
+            if (entry := self.channel_cache.get(ycid)) is not None and self.channel_cache.is_fresh(entry):
+                self.channel_cache.hits += 1
+                channels[ycid] = entry.body
+            else:
+                to_fetch.append(ycid)
+
+        if len(to_fetch) == 1:
+            ycid = to_fetch[0]
+            entry = self.channel_cache.get(ycid)
+            data = await self.do_api_call('channels', {'part': 'snippet,statistics', 'id': ycid},
+                                          etag=entry and entry.etag)
+            if data is None:
+                self.channel_cache.revalidated += 1
+                self.channel_cache.touch(ycid)
+                channels[ycid] = entry.body
+            else:
+                self.channel_cache.misses += 1
+                for item in data['items']:
+                    self.channel_cache.put(ycid, item, data.get('etag'))
+                    channels[ycid] = item
+        elif to_fetch:
+            self.channel_cache.misses += len(to_fetch)
+            for ycid, item in (await self.get_batched('channels', 'snippet,statistics', to_fetch)).items():
+                self.channel_cache.put(ycid, item, None)
+                channels[ycid] = item
+
+        # Compare against looking every channel up in batches with no cache
+        requests = math.ceil(len(to_fetch) / MAX_IDS_PER_REQUEST)
+        self.channel_cache.requests_saved += math.ceil(len(ycids) / MAX_IDS_PER_REQUEST) - requests
+        return channels
+
+    async def get_videos(self, video_ids) -> Dict[str, Dict[str, Any]]:
+        return await self.get_batched('videos', 'statistics', video_ids)
+
+    async def get_uploads(self, ycid: str, backend: str = 'playlist', max_results: int = 15) -> List[Dict[str, Any]]:
+        """Get a channel's most recent uploads, newest first.
+
+        `feed` costs no quota and `playlist` costs 1 unit.  `search` costs 100
+        units, so a cheaper backend only falls back to it when it fails in a
+        way that might be temporary.  Each channel may fall back to search
+        once per quota day, and only while the quota's fallback allowance
+        lasts.
+        """
+        methods = BACKENDS[backend]
+        for method, next_method in zip(methods, methods[1:] + (None,)):
+            try:
+                if method == 'feed':
+                    return await self.get_feed_uploads(ycid)
+                elif method == 'playlist':
+                    return await self.get_playlist_uploads(ycid, max_results)
+                elif method == backend:
+                    return await self.get_search_uploads(ycid, max_results)
+                self.search_fallbacks[ycid] = self.quota.day
+                return await self.get_search_uploads(ycid, max_results, quota_key=FALLBACK)
+            except Exception as e:
+                if next_method is None or (next_method == 'search' and not self.can_fall_back(ycid, e)):
+                    raise
+                logger.warning("Unable to get uploads for %s with %s.  Falling back to %s.",
+                               ycid, method, next_method, exc_info=True)
+
+    def can_fall_back(self, ycid: str, error: Exception) -> bool:
+        """Whether a failed poll of a channel may be retried with search"""
+        self.quota.rollover()
+        return (is_transient(error)
+                and self.search_fallbacks.get(ycid) != self.quota.day
+                and self.quota.fallback_remaining >= ENDPOINT_COSTS['search'])
+
+    async def get_feed_uploads(self, ycid: str) -> List[Dict[str, Any]]:
+        async with self.session.get(self.feed_endpoint, params={'channel_id': ycid}) as resp:
+            resp.raise_for_status()
+            return parse_feed(await resp.text())
+
+    async def get_playlist_uploads(self, ycid: str, max_results: int) -> List[Dict[str, Any]]:
+        uploads_id = await self.get_uploads_id(ycid)
+        try:
+            data = await self.do_api_call('playlistItems', {'part': 'snippet,contentDetails,status',
+                                                            'playlistId': uploads_id, 'maxResults': max_results})
+        except YouTubeAPIError as e:
+            # Channels that have never uploaded a public video have no uploads playlist
+            if e.reason == 'playlistNotFound':
+                return []
+            raise
+        return [make_video(item['contentDetails']['videoId'],
+                           item['snippet']['title'],
+                           item['snippet']['description'],
+                           item['contentDetails'].get('videoPublishedAt', item['snippet']['publishedAt']),
+                           item['snippet']['thumbnails'].get('high', {}).get('url'),
+                           item['snippet'].get('videoOwnerChannelId', ycid))
+                for item in data['items']
+                if item['status']['privacyStatus'] == 'public']
+
+    async def get_search_uploads(self, ycid: str, max_results: int,
+                                 quota_key: Optional[str] = None) -> List[Dict[str, Any]]:
+        data = await self.do_api_call('search', {'part': 'snippet', 'channel_id': ycid, 'maxResults': max_results,
+                                                 'order': 'date', 'type': 'video'}, quota_key=quota_key)
+        return data['items']
+
+    async def get_uploads_id(self, ycid: str) -> str:
+        """Get the ID of a channel's uploads playlist"""
+        if ycid.startswith('UC'):
+            # Uploads playlists share the channel's ID with a different prefix
+            return 'UU' + ycid[2:]
+        if ycid not in self.uploads_ids:
+            data = await self.do_api_call('channels', {'part': 'contentDetails', 'id': ycid})
+            self.uploads_ids[ycid] = data['items'][0]['contentDetails']['relatedPlaylists']['uploads']
+        return self.uploads_ids[ycid]